@@ -3,13 +3,17 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timezone
 from typing import Any
 
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from src.agents.constants import AGENT_MAX_RETRIES, AGENT_MAX_TOKENS, AGENT_TIMEOUTS, MEMORY_AGENTS
+from src.agents.constants import (
+    AGENT_MAX_RETRIES,
+    AGENT_MAX_TOKENS,
+    AGENT_TIMEOUTS,
+    MEMORY_AGENTS,
+)
 from src.config.settings import get_settings
 from src.state import TripState
 
@@ -78,20 +82,6 @@ def format_money(amount: float | None, symbol: str = "$", code: str = "USD") ->
     return f"{symbol}{amount:,.2f}"
 
 
-def add_to_conversation_history(state: TripState, role: str, content: str, agent: str | None = None) -> list:
-    """Append a message to conversation history and return updated list."""
-    history = list(state.get("conversation_history", []))
-    history.append(
-        {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "agent": agent,
-        }
-    )
-    return history
-
-
 # ─── Token Budgeting ────────────────────────────────────
 
 _DEFAULT_INPUT_BUDGET = 160_000  # conservative for 200K context models
@@ -208,6 +198,9 @@ class BaseAgent:
 
         return result
 
+    async def warmup(self) -> None:
+        """Optional startup hook for agents with async initialisation. No-op by default."""
+
     def get_system_prompt(self, state: TripState | None = None) -> str:
         """Override in subclasses to provide the agent-specific system prompt."""
         return "You are a helpful travel planning assistant."
@@ -23,4 +23,18 @@ AGENT_MAX_RETRIES: dict[str, int] = {
     "research": 2,  # extra retry — research is the most timeout-prone call
 }
 
+# Every agent the orchestrator can hand a message to
+SPECIALIST_AGENTS = frozenset({"onboarding", "research", "prioritizer", "planner", "scheduler", "feedback", "cost"})
+
+# Specialists that never emit loopback signals (_awaiting_input / _delegate_to / _callback)
+# and can therefore run concurrently when one message needs several of them.
+# fan_in_node merges their state_updates shallowly (last writer wins), so members
+# must write disjoint top-level keys — today priorities, detailed_agenda and
+# cost_tracker respectively. Check that before adding an agent here.
+PARALLEL_SAFE_AGENTS = frozenset({"prioritizer", "scheduler", "cost"})
+
+# Number of recent conversation messages kept in graph state. The full history is
+# persisted append-only to the messages table by the handler.
+CONVERSATION_HISTORY_WINDOW = 50
+
 NOTES_ELIGIBLE_AGENTS = {"research", "planner", "feedback"}
@@ -4,11 +4,10 @@ from __future__ import annotations
 
 import json
 import logging
-from datetime import datetime, timezone
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from src.agents.base import BaseAgent, add_to_conversation_history
+from src.agents.base import BaseAgent
 from src.state import TripState
 
 logger = logging.getLogger(__name__)
@@ -194,15 +193,6 @@ class FeedbackAgent(BaseAgent):
                     clean = "Thanks for sharing! I've logged everything and will adjust your upcoming days."
                 response_text = clean
 
-        # Update conversation history
-        updated_history = add_to_conversation_history(state, "user", user_message)
-        updated_history.append({
-            "role": "assistant",
-            "content": response_text,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "agent": "feedback",
-        })
-        state_updates["conversation_history"] = updated_history
         state_updates["current_agent"] = "feedback"
 
         return {"response": response_text, "state_updates": state_updates}
@@ -4,12 +4,12 @@ from __future__ import annotations
 
 import json
 import logging
-import uuid
 from datetime import datetime, timezone
+from secrets import token_hex
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from src.agents.base import BaseAgent, add_to_conversation_history
+from src.agents.base import BaseAgent
 from src.state import TripState
 
 logger = logging.getLogger(__name__)
@@ -246,16 +246,6 @@ class OnboardingAgent(BaseAgent):
                     state_updates["onboarding_complete"] = True
                     state_updates["onboarding_depth"] = depth
 
-        # Update conversation history
-        updated_history = add_to_conversation_history(state, "user", user_message)
-        updated_history = list(updated_history)
-        updated_history.append({
-            "role": "assistant",
-            "content": response_text,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "agent": "onboarding",
-        })
-        state_updates["conversation_history"] = updated_history
         state_updates["current_agent"] = "onboarding"
 
         return {"response": response_text, "state_updates": state_updates}
@@ -272,7 +262,7 @@ class OnboardingAgent(BaseAgent):
 
     def _build_state_from_config(self, config: dict, state: TripState) -> dict:
         """Build state updates from confirmed onboarding config."""
-        trip_id = state.get("trip_id") or str(uuid.uuid4())[:8]
+        trip_id = state.get("trip_id") or token_hex(4)
         now = datetime.now(timezone.utc).isoformat()
 
         updates: dict = {
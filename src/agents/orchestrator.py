@@ -7,7 +7,8 @@ from typing import Any
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from src.agents.base import BaseAgent, add_to_conversation_history, format_money
+from src.agents.base import BaseAgent, format_money
+from src.agents.constants import PARALLEL_SAFE_AGENTS, SPECIALIST_AGENTS
 from src.state import TripState
 
 logger = logging.getLogger(__name__)
@@ -29,6 +30,9 @@ COMMAND_MAP: dict[str, str] = {
     "/join": "orchestrator",
 }
 
+# Valid answers from the intent classifier
+_CLASSIFIER_TARGETS = SPECIALIST_AGENTS | {"orchestrator"}
+
 # Agents that require prior steps — soft guards that offer to help
 PREREQUISITES: dict[str, list[tuple[str, str]]] = {
     "prioritizer": [(
@@ -113,26 +117,26 @@ class OrchestratorAgent(BaseAgent):
         # Priority 1: Agent waiting for user reply
         if state.get("_awaiting_input"):
             target = state["_awaiting_input"]
-            if target in {"onboarding", "research", "prioritizer", "planner", "scheduler", "feedback", "cost"}:
+            if target in SPECIALIST_AGENTS:
                 return {"target_agent": target}
 
         # Priority 2: Callback from delegation
         if state.get("_callback"):
             target = state["_callback"]
-            if target in {"onboarding", "research", "prioritizer", "planner", "scheduler", "feedback", "cost"}:
+            if target in SPECIALIST_AGENTS:
                 return {"target_agent": target}
 
         # Priority 3: Delegate to another agent
         if state.get("_delegate_to"):
             target = state["_delegate_to"]
-            if target in {"onboarding", "research", "prioritizer", "planner", "scheduler", "feedback", "cost"}:
+            if target in SPECIALIST_AGENTS:
                 return {"target_agent": target}
 
         # Priority 4: Pop from chain
         chain = state.get("_chain", [])
         if chain:
             target = chain[0]  # Will be popped by graph
-            if target in {"onboarding", "research", "prioritizer", "planner", "scheduler", "feedback", "cost"}:
+            if target in SPECIALIST_AGENTS:
                 return {"target_agent": target}
 
         # Loopback depth enforcement
@@ -294,7 +298,9 @@ class OrchestratorAgent(BaseAgent):
 
         classification_prompt += (
             f"TRIP STATE:\n{state_summary}\n\n"
-            "Respond with ONLY the agent name."
+            "Respond with ONLY the agent name. If the message clearly asks for several "
+            "independent things (e.g. 'show tomorrow and how much I've spent'), respond with "
+            "the agent names separated by commas, most important first."
         )
 
         messages = [
@@ -303,14 +309,10 @@ class OrchestratorAgent(BaseAgent):
         ]
 
         response = await self.llm.ainvoke(messages)
-        agent_name = response.content.strip().lower()
-
-        valid_agents = {
-            "onboarding", "research", "prioritizer",
-            "planner", "scheduler", "feedback", "cost", "orchestrator",
-        }
+        names = [n.strip() for n in response.content.strip().lower().split(",") if n.strip()]
+        agent_name = names[0] if names else ""
 
-        if agent_name not in valid_agents:
+        if agent_name not in _CLASSIFIER_TARGETS:
             agent_name = "orchestrator"
 
         # Clear stale _awaiting_input if LLM routes to a different agent
@@ -328,6 +330,15 @@ class OrchestratorAgent(BaseAgent):
             response_text = await self.invoke(state, message)
             return {"target_agent": "orchestrator", "response": response_text}
 
+        # Independent specialists that can run in parallel alongside the primary target
+        if agent_name in PARALLEL_SAFE_AGENTS:
+            targets = [agent_name]
+            for name in names[1:]:
+                if name in PARALLEL_SAFE_AGENTS and name not in targets and not self._check_prerequisites(state, name):
+                    targets.append(name)
+            if len(targets) > 1:
+                return {"target_agent": agent_name, "target_agents": targets}
+
         return {"target_agent": agent_name}
 
     async def _welcome_back_with_ideas(self, state: TripState) -> str:
@@ -526,7 +526,7 @@ class ResearchAgent(BaseAgent):
             return None
 
         try:
-            updated_dt = datetime.fromisoformat(last_updated.replace("Z", "+00:00"))
+            updated_dt = datetime.fromisoformat(last_updated)
         except (ValueError, TypeError):
             return None
 
@@ -21,6 +21,9 @@ class Settings(BaseSettings):
     LLM_TIMEOUT: float = 120.0
     LLM_MAX_RETRIES: int = 1
 
+    # Construct all specialist agents at startup instead of on first use
+    PREWARM_AGENTS: bool = True
+
     AGENT_MODELS: dict[str, str] = {
         "orchestrator": "claude-sonnet-4-5-20250929",
         "onboarding": "claude-sonnet-4-5-20250929",
@@ -2,7 +2,7 @@
 
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, DateTime, Index, String, Text, UniqueConstraint
+from sqlalchemy import Boolean, DateTime, Index, String, Text, UniqueConstraint, false, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -17,6 +17,8 @@ class Trip(Base):
     user_id: Mapped[str] = mapped_column(String(64), nullable=False)
     destination_country: Mapped[str | None] = mapped_column(String(128))
     state_json: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    # Small projection of state_json holding only what trip listings display
+    listing_json: Mapped[str | None] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=lambda: datetime.now(timezone.utc)
     )
@@ -25,11 +27,20 @@ class Trip(Base):
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
     )
-    archived: Mapped[bool] = mapped_column(Boolean, default=False)
+    archived: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false(), nullable=False)
 
     __table_args__ = (
         Index("idx_trips_user", "user_id"),
-        Index("idx_trips_active", "user_id", "archived"),
+        # Partial index covering the "list active trips" query (filter + ORDER BY updated_at).
+        # Named apart from the old (user_id, archived) idx_trips_active, which init_db
+        # drops from existing databases before creating this one.
+        Index(
+            "idx_trips_user_active",
+            "user_id",
+            "updated_at",
+            postgresql_where=text("archived = false"),
+            sqlite_where=text("archived = 0"),
+        ),
     )
 
     def __repr__(self) -> str:
@@ -50,3 +61,22 @@ class TripMember(Base):
         UniqueConstraint("trip_id", "user_id", name="uq_trip_member"),
         Index("idx_trip_members_user", "user_id"),
     )
+
+
+class ConversationMessage(Base):
+    """Append-only log of every conversation message for a trip."""
+
+    __tablename__ = "messages"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    trip_id: Mapped[str] = mapped_column(String(128), nullable=False)
+    role: Mapped[str] = mapped_column(String(16), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    agent: Mapped[str | None] = mapped_column(String(32))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc)
+    )
+
+    __table_args__ = (
+        Index("idx_messages_trip", "trip_id", "id"),
+    )
@@ -2,39 +2,139 @@
 
 from __future__ import annotations
 
-import json
 import logging
 from datetime import datetime, timezone
 
-from sqlalchemy import select, union_all
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import orjson
+from sqlalchemy import inspect, insert, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import load_only
 
-from src.db.models import Base, Trip, TripMember
+from src.db.models import Base, ConversationMessage, Trip, TripMember
 
 logger = logging.getLogger(__name__)
 
+_loads = orjson.loads
+_DUMPS_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+
+
+def _dumps(state: dict) -> str:
+    """Serialize trip state for the state_json column.
+
+    Non-JSON values fall back to ``str()`` and non-string keys are stringified,
+    matching what ``json.dumps(default=str)`` previously accepted. Datetimes are
+    written natively as ISO 8601, with naive ones tagged UTC so they compare
+    cleanly against the aware timestamps the agents store.
+    """
+    return orjson.dumps(state, default=str, option=_DUMPS_OPTS).decode()
+
+
+# State keys whose truthiness drives the listing progress label
+_PROGRESS_KEYS = ("onboarding_complete", "research", "priorities", "high_level_plan", "detailed_agenda")
+
+
+def listing_projection(state: dict) -> dict:
+    """Reduce trip state to the fields shown in trip listings.
+
+    The result has the same shape as the state (missing keys stay missing), so
+    listing code can render either one.
+    """
+    dest = state.get("destination") or {}
+    dates = state.get("dates") or {}
+    projection: dict = {key: True for key in _PROGRESS_KEYS if state.get(key)}
+    if state.get("trip_title"):
+        projection["trip_title"] = state["trip_title"]
+    if dest:
+        projection["destination"] = {k: dest[k] for k in ("country", "flag_emoji") if k in dest}
+    if state.get("cities"):
+        projection["cities"] = [{"name": c.get("name", "")} for c in state["cities"]]
+    if dates:
+        projection["dates"] = {k: dates[k] for k in ("start", "end") if k in dates}
+    return projection
+
+
+def _store_state(trip: Trip, state: dict) -> None:
+    """Write *state* to the trip along with its denormalized columns."""
+    trip.state_json = _dumps(state)
+    trip.destination_country = (state.get("destination") or {}).get("country")
+    trip.listing_json = _dumps(listing_projection(state))
+
+
+def _message_rows(trip_id: str, messages: list[dict]) -> list[dict]:
+    """Build ConversationMessage insert rows for *messages*."""
+    return [
+        {
+            "trip_id": trip_id,
+            "role": m.get("role", "user"),
+            "content": m.get("content", ""),
+            "agent": m.get("agent"),
+        }
+        for m in messages
+    ]
+
+
+def _add_missing_columns(sync_conn) -> None:
+    """Bring a database created by an older version up to date.
+
+    create_all skips tables that already exist — along with their indexes — so
+    columns and indexes added since are created here, and superseded ones dropped.
+    """
+    inspector = inspect(sync_conn)
+    existing = {col["name"] for col in inspector.get_columns("trips")}
+    if "listing_json" not in existing:
+        sync_conn.execute(text("ALTER TABLE trips ADD COLUMN listing_json TEXT"))
+    indexes = {ix["name"] for ix in inspector.get_indexes("trips")}
+    # Replaced by the partial idx_trips_user_active
+    if "idx_trips_active" in indexes:
+        sync_conn.execute(text("DROP INDEX idx_trips_active"))
+    for index in Trip.__table__.indexes:
+        if index.name not in indexes:
+            index.create(sync_conn)
+
+
+# asyncpg keeps a per-connection prepared-statement cache; most of our queries are
+# small and repeated (get-by-PK, membership checks), so give it plenty of room.
+_ASYNCPG_CONNECT_ARGS = {"prepared_statement_cache_size": 500}
+
+
+def normalize_database_url(database_url: str) -> str:
+    """Rewrite plain Postgres URLs to use the asyncpg driver."""
+    for prefix in ("postgres://", "postgresql://"):
+        if database_url.startswith(prefix):
+            return "postgresql+asyncpg://" + database_url[len(prefix):]
+    return database_url
+
+
+def create_engine(database_url: str, **kwargs) -> AsyncEngine:
+    """Create an async engine, tuning driver options for Postgres/asyncpg."""
+    database_url = normalize_database_url(database_url)
+    if database_url.startswith("postgresql+asyncpg://"):
+        kwargs.setdefault("connect_args", _ASYNCPG_CONNECT_ARGS)
+    return create_async_engine(database_url, **kwargs)
+
 
 class TripRepository:
     """Async repository for Trip CRUD backed by SQLAlchemy."""
 
     def __init__(self, database_url: str) -> None:
-        self.engine = create_async_engine(database_url, echo=False)
+        self.engine = create_engine(database_url, echo=False)
         self.async_session = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
 
     async def init_db(self) -> None:
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_add_missing_columns)
         logger.info("Database tables initialised.")
 
+    async def warmup(self) -> None:
+        """Check out a pooled connection and round-trip a trivial query."""
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
     async def create_trip(self, trip_id: str, user_id: str, state: dict) -> Trip:
         async with self.async_session() as session:
-            country = state.get("destination", {}).get("country")
-            trip = Trip(
-                trip_id=trip_id,
-                user_id=user_id,
-                destination_country=country,
-                state_json=json.dumps(state, default=str),
-            )
+            trip = Trip(trip_id=trip_id, user_id=user_id)
+            _store_state(trip, state)
             session.add(trip)
             await session.commit()
             await session.refresh(trip)
@@ -73,8 +173,7 @@ class TripRepository:
             trip = await session.get(Trip, trip_id)
             if trip is None:
                 raise ValueError(f"Trip {trip_id} not found")
-            trip.state_json = json.dumps(state, default=str)
-            trip.destination_country = state.get("destination", {}).get("country")
+            _store_state(trip, state)
             trip.updated_at = datetime.now(timezone.utc)
             await session.commit()
 
@@ -84,13 +183,58 @@ class TripRepository:
             trip = await session.get(Trip, trip_id)
             if trip is None:
                 raise ValueError(f"Trip {trip_id} not found")
-            existing = json.loads(trip.state_json) if trip.state_json else {}
+            existing = _loads(trip.state_json) if trip.state_json else {}
             existing.update(updates)
-            trip.state_json = json.dumps(existing, default=str)
-            trip.destination_country = existing.get("destination", {}).get("country")
+            _store_state(trip, existing)
             trip.updated_at = datetime.now(timezone.utc)
             await session.commit()
 
+    async def upsert_state(self, trip_id: str, user_id: str, updates: dict) -> None:
+        """Merge *updates* into the trip's state, creating the trip if it does not exist.
+
+        One session replaces the get_trip + merge_state/create_trip sequence.
+        The merge is a shallow ``dict.update`` like merge_state (SQL JSON-patch
+        functions would drop keys set to None).
+        """
+        async with self.async_session() as session:
+            await self._upsert_in(session, trip_id, user_id, updates)
+            await session.commit()
+
+    async def save_turn(
+        self,
+        trip_id: str,
+        user_id: str,
+        updates: dict,
+        messages: list[dict] | None = None,
+        copy_to: str | None = None,
+    ) -> None:
+        """Persist one conversation turn in a single transaction.
+
+        Upserts *updates* into the trip, appends *messages* to its log and, when
+        onboarding assigned a new trip id, upserts the same updates under *copy_to*.
+        """
+        async with self.async_session() as session:
+            await self._upsert_in(session, trip_id, user_id, updates)
+            if copy_to and copy_to != trip_id:
+                await self._upsert_in(session, copy_to, user_id, updates)
+            if messages:
+                await session.execute(insert(ConversationMessage), _message_rows(trip_id, messages))
+            await session.commit()
+
+    @staticmethod
+    async def _upsert_in(session: AsyncSession, trip_id: str, user_id: str, updates: dict) -> None:
+        trip = await session.get(Trip, trip_id)
+        if trip is None:
+            state = updates
+            trip = Trip(trip_id=trip_id, user_id=user_id)
+            session.add(trip)
+            logger.info("Created trip %s for user %s", trip_id, user_id)
+        else:
+            state = _loads(trip.state_json) if trip.state_json else {}
+            state.update(updates)
+            trip.updated_at = datetime.now(timezone.utc)
+        _store_state(trip, state)
+
     async def archive_trip(self, trip_id: str) -> None:
         async with self.async_session() as session:
             trip = await session.get(Trip, trip_id)
@@ -101,10 +245,14 @@ class TripRepository:
             await session.commit()
             logger.info("Archived trip %s", trip_id)
 
-    async def add_member(self, trip_id: str, user_id: str) -> None:
-        """Add a user as a member of a trip. Idempotent — no-op if already owner or member."""
+    async def add_member(self, trip_id: str, user_id: str, trip: Trip | None = None) -> None:
+        """Add a user as a member of a trip. Idempotent — no-op if already owner or member.
+
+        Pass an already-loaded *trip* to skip re-fetching it.
+        """
         async with self.async_session() as session:
-            trip = await session.get(Trip, trip_id)
+            if trip is None:
+                trip = await session.get(Trip, trip_id, options=[load_only(Trip.user_id, Trip.archived)])
             if trip is None:
                 raise ValueError(f"Trip {trip_id} not found")
             if trip.user_id == user_id:
@@ -118,10 +266,14 @@ class TripRepository:
             await session.commit()
             logger.info("User %s joined trip %s", user_id, trip_id)
 
-    async def is_member(self, trip_id: str, user_id: str) -> bool:
-        """Return True if user_id is the owner or a member of the trip."""
+    async def is_member(self, trip_id: str, user_id: str, trip: Trip | None = None) -> bool:
+        """Return True if user_id is the owner or a member of the trip.
+
+        Pass an already-loaded *trip* to skip re-fetching it.
+        """
         async with self.async_session() as session:
-            trip = await session.get(Trip, trip_id)
+            if trip is None:
+                trip = await session.get(Trip, trip_id, options=[load_only(Trip.user_id, Trip.archived)])
             if trip is None:
                 return False
             if trip.user_id == user_id:
@@ -142,5 +294,44 @@ class TripRepository:
             )
             return list(result.scalars().all())
 
+    async def bulk_append_messages(self, trip_id: str, messages: list[dict]) -> None:
+        """Append conversation messages to the trip's full history log in one INSERT."""
+        if not messages:
+            return
+        async with self.async_session() as session:
+            await session.execute(insert(ConversationMessage), _message_rows(trip_id, messages))
+            await session.commit()
+
+    async def get_messages(self, trip_id: str, limit: int | None = None) -> list[ConversationMessage]:
+        """Return the trip's logged messages in chronological order (most recent *limit* if given)."""
+        async with self.async_session() as session:
+            query = (
+                select(ConversationMessage)
+                .where(ConversationMessage.trip_id == trip_id)
+                .order_by(ConversationMessage.id.desc())
+            )
+            if limit is not None:
+                query = query.limit(limit)
+            result = await session.execute(query)
+            return list(reversed(result.scalars().all()))
+
+    async def recent_history(self, trip_id: str, limit: int) -> list[dict]:
+        """The trip's last *limit* logged messages as conversation_history entries.
+
+        Rebuilds the in-state history window from the full log, e.g. when the
+        graph checkpoint for the trip is gone.
+        """
+        return [
+            {
+                "role": m.role,
+                "content": m.content,
+                "timestamp": (
+                    m.created_at if m.created_at.tzinfo else m.created_at.replace(tzinfo=timezone.utc)
+                ).isoformat(),
+                "agent": m.agent,
+            }
+            for m in await self.get_messages(trip_id, limit=limit)
+        ]
+
     async def close(self) -> None:
         await self.engine.dispose()
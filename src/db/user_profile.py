@@ -4,13 +4,16 @@ from __future__ import annotations
 
 import json
 import logging
+from collections import Counter
 from datetime import datetime, timezone
 from typing import Any, Optional
 
 from sqlalchemy import Column, DateTime, String, Text, select
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
+from src.db.persistence import create_engine
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,7 +51,7 @@ class UserProfileRepository:
     """CRUD operations for user profiles."""
 
     def __init__(self, database_url: str) -> None:
-        self.engine = create_async_engine(database_url)
+        self.engine = create_engine(database_url)
         self.session_factory = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
 
     async def init_table(self) -> None:
@@ -153,26 +156,26 @@ class UserProfileRepository:
         if country:
             updates["visited_countries"] = [country]
 
-        # Infer pace from feedback
+        # Infer pace and food preferences from feedback in a single pass
         feedback = trip_state.get("feedback_log", [])
+        energy_counts: Counter[str] = Counter()
+        food_prefs = []
+        for f in feedback:
+            energy_counts[f.get("energy_level", "medium")] += 1
+            if f.get("food_rating") == "amazing":
+                food_prefs.append(f.get("city", ""))
+
         if feedback:
-            energy_levels = [f.get("energy_level", "medium") for f in feedback]
-            low_count = sum(1 for e in energy_levels if e == "low")
-            high_count = sum(1 for e in energy_levels if e == "high")
-            if low_count > len(energy_levels) / 2:
+            total = len(feedback)
+            if energy_counts["low"] * 2 > total:
                 updates["pace"] = "slow"
-            elif high_count > len(energy_levels) / 2:
+            elif energy_counts["high"] * 2 > total:
                 updates["pace"] = "fast"
             else:
                 updates["pace"] = "moderate"
 
             # Infer energy pattern (not enough data usually, skip for now)
 
-        # Extract food preferences from feedback
-        food_prefs = []
-        for f in feedback:
-            if f.get("food_rating") == "amazing":
-                food_prefs.append(f.get("city", ""))
         if food_prefs:
             updates["food_preferences"] = food_prefs
 
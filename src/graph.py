@@ -2,62 +2,133 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import importlib
 import logging
 from datetime import datetime, timezone
-from typing import Any
-
 from langgraph.graph import END, StateGraph
-from langgraph.types import Command
+from langgraph.types import Command, Send
 
-from src.agents.base import add_to_conversation_history
-from src.agents.onboarding import OnboardingAgent
-from src.agents.orchestrator import OrchestratorAgent
+from src.agents.constants import PARALLEL_SAFE_AGENTS, SPECIALIST_AGENTS
 from src.state import TripState
 
 logger = logging.getLogger(__name__)
 
 # ─── Agent sets ─────────────────────────────────
 
-SPECIALIST_AGENTS = {"onboarding", "research", "prioritizer", "planner", "scheduler", "feedback", "cost"}
-LOOPBACK_AGENTS = {"research", "planner", "feedback"}  # agents that can loop back to user
+LOOPBACK_AGENTS = frozenset({"research", "planner", "feedback"})  # agents that can loop back to user
+NON_LOOPBACK_AGENTS = SPECIALIST_AGENTS - LOOPBACK_AGENTS - {"onboarding"}
+
+# Nodes the orchestrator may hand a single turn to
+ORCH_TARGETS = SPECIALIST_AGENTS | {"error_handler"}
+
+# Conditional-edge path maps (static — built once at import)
+ORCH_ROUTE_MAP = {
+    **{a: a for a in SPECIALIST_AGENTS},
+    "error_handler": "error_handler",
+    "fan_out_worker": "fan_out_worker",
+    END: END,
+}
+LOOPBACK_ROUTE_MAP = {
+    "error_handler": "error_handler",
+    END: END,
+    **{a: a for a in SPECIALIST_AGENTS if a != "onboarding"},
+}
+
+# Per-turn routing keys, nulled by terminal nodes so they are not carried in
+# every checkpoint (and a stale _routing_echo is never replayed next turn)
+_TURN_DONE = {"_next": None, "_user_message": None, "_routing_echo": None}
+
+# Lazy singletons — constructed on first use so importing the graph stays cheap
+_orchestrator = None
+_onboarding = None
+
+# Specialist agents imported lazily to avoid circular imports at module level.
+# Maps agent name → (module path, class name).
+_AGENT_CLASSES: dict[str, tuple[str, str]] = {
+    "research": ("src.agents.research", "ResearchAgent"),
+    "prioritizer": ("src.agents.prioritizer", "PrioritizerAgent"),
+    "planner": ("src.agents.planner", "PlannerAgent"),
+    "scheduler": ("src.agents.scheduler", "SchedulerAgent"),
+    "feedback": ("src.agents.feedback", "FeedbackAgent"),
+    "cost": ("src.agents.cost", "CostAgent"),
+}
+
+
+def _get_orchestrator():
+    """Return the orchestrator singleton, importing and constructing it on first call."""
+    global _orchestrator
+    if _orchestrator is None:
+        from src.agents.orchestrator import OrchestratorAgent
+
+        _orchestrator = OrchestratorAgent()
+    return _orchestrator
+
+
+def _get_onboarding():
+    """Return the onboarding singleton, importing and constructing it on first call."""
+    global _onboarding
+    if _onboarding is None:
+        from src.agents.onboarding import OnboardingAgent
+
+        _onboarding = OnboardingAgent()
+    return _onboarding
+
+
+@functools.cache
+def _get_agent(name: str):
+    """Lazy-load specialist agents. Cached so each agent is constructed exactly once."""
+    spec = _AGENT_CLASSES.get(name)
+    if spec is None:
+        return None
+    module_name, class_name = spec
+    return getattr(importlib.import_module(module_name), class_name)()
 
-# Lazy singletons — instantiated once per process
-_orchestrator = OrchestratorAgent()
-_onboarding = OnboardingAgent()
 
-# Specialist agents imported lazily to avoid circular imports at module level
-_agents: dict[str, Any] = {}
+# ─── Node functions ──────────────────────────────
 
 
-def _get_agent(name: str):
-    """Lazy-load specialist agents."""
-    if name not in _agents:
-        if name == "research":
-            from src.agents.research import ResearchAgent
-            _agents[name] = ResearchAgent()
-        elif name == "prioritizer":
-            from src.agents.prioritizer import PrioritizerAgent
-            _agents[name] = PrioritizerAgent()
-        elif name == "planner":
-            from src.agents.planner import PlannerAgent
-            _agents[name] = PlannerAgent()
-        elif name == "scheduler":
-            from src.agents.scheduler import SchedulerAgent
-            _agents[name] = SchedulerAgent()
-        elif name == "feedback":
-            from src.agents.feedback import FeedbackAgent
-            _agents[name] = FeedbackAgent()
-        elif name == "cost":
-            from src.agents.cost import CostAgent
-            _agents[name] = CostAgent()
-    return _agents.get(name)
+def _mk_msg(role: str, content: str, agent: str | None = None, timestamp: str | None = None) -> dict:
+    """Build one canonical Message dict (see ``src.state.Message``)."""
+    return {"role": role, "content": content, "timestamp": timestamp, "agent": agent}
 
 
-# ─── Node functions ──────────────────────────────
+def _history_turn(user_text: str, response: str, agent: str, timestamp: str) -> list:
+    """The two conversation_history entries for one exchange.
+
+    Nodes return only these; the ``merge_conversation_history`` reducer on
+    TripState appends them, so the full history is never copied per turn.
+    The assistant entry doubles as the node's ``messages`` output.
+    """
+    return [_mk_msg("user", user_text, None, timestamp), _mk_msg("assistant", response, agent, timestamp)]
+
+
+def last_user_text(state: TripState) -> str:
+    """Return the user text this turn is answering.
+
+    Messages enter the graph as canonical ``Message`` dicts with ``role`` and
+    ``content`` set (built by the Telegram handler). A trailing user message
+    means a new turn; otherwise a specialist looped back mid-turn and
+    ``_user_message`` still holds the text.
+    """
+    messages = state.get("messages")
+    if not messages:
+        return ""
+    last = messages[-1]
+    if last["role"] == "user":
+        return last["content"]
+    return state.get("_user_message") or ""
 
 
 async def orchestrator_node(state: TripState) -> dict:
-    """Entry node — routes every message to the correct agent."""
+    """Entry node — routes every message to the correct agent.
+
+    Every routed return sets ``_user_message``, so downstream nodes read it
+    directly instead of re-deriving it from ``messages``.
+    """
+    user_text = last_user_text(state)
+
     # v2: Check graph control keys before normal routing
     if state.get("_awaiting_input"):
         # Resuming from a loopback — route back to the agent that requested input
@@ -65,6 +136,7 @@ async def orchestrator_node(state: TripState) -> dict:
         return {
             "current_agent": target,
             "_awaiting_input": None,
+            "_user_message": user_text,
             "_next": target,
         }
 
@@ -73,6 +145,7 @@ async def orchestrator_node(state: TripState) -> dict:
         return {
             "current_agent": target,
             "_callback": None,
+            "_user_message": user_text,
             "_next": target,
         }
 
@@ -81,6 +154,7 @@ async def orchestrator_node(state: TripState) -> dict:
         return {
             "current_agent": target,
             "_delegate_to": None,
+            "_user_message": user_text,
             "_next": target,
         }
 
@@ -91,37 +165,43 @@ async def orchestrator_node(state: TripState) -> dict:
         return {
             "current_agent": target,
             "_chain": remaining,
+            "_user_message": user_text,
             "_next": target,
         }
 
     # Normal routing
-    messages = state.get("messages", [])
-    if not messages:
+    if not state.get("messages"):
         return {"messages": [{"role": "assistant", "content": "Send /start to begin planning!"}]}
 
-    last_msg = messages[-1]
-    user_text = last_msg.get("content", "") if isinstance(last_msg, dict) else getattr(last_msg, "content", "")
-
-    routing = await _orchestrator.route(state, user_text)
+    routing = await _get_orchestrator().route(state, user_text)
     target = routing.get("target_agent", "orchestrator")
     direct_response = routing.get("response")
 
     if direct_response and target == "orchestrator":
-        history = add_to_conversation_history(state, "user", user_text)
-        history.append({
-            "role": "assistant",
-            "content": direct_response,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "agent": "orchestrator",
-        })
+        if user_text.startswith("/"):
+            # Command replies (/status, unknown command, prerequisite guards) are
+            # informational — keep them out of conversation_history
+            return {"messages": [{"role": "assistant", "content": direct_response}], **_TURN_DONE, "_next": END}
+        now_iso = datetime.now(timezone.utc).isoformat()
+        history = _history_turn(user_text, direct_response, "orchestrator", now_iso)
         return {
-            "messages": [{"role": "assistant", "content": direct_response}],
+            "messages": history[-1:],
             "conversation_history": history,
             "current_agent": "orchestrator",
-            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "updated_at": now_iso,
             "_next": END,
         }
 
+    # Several independent specialists — fan out and run them concurrently
+    targets = [t for t in routing.get("target_agents") or [] if t in PARALLEL_SAFE_AGENTS]
+    if len(targets) > 1:
+        return {
+            "current_agent": targets[0],
+            "_user_message": user_text,
+            "_fan_out": targets,
+            "_next": "fan_out",
+        }
+
     result = {
         "current_agent": target,
         "_user_message": user_text,
@@ -137,15 +217,10 @@ async def orchestrator_node(state: TripState) -> dict:
 
 async def onboarding_node(state: TripState) -> dict:
     """Onboarding agent node."""
-    user_msg = state.get("_user_message", "")
-    if not user_msg:
-        msgs = state.get("messages", [])
-        if msgs:
-            last = msgs[-1]
-            user_msg = last.get("content", "") if isinstance(last, dict) else getattr(last, "content", "")
+    user_msg = state["_user_message"]
 
     try:
-        result = await _onboarding.handle(state, user_msg)
+        result = await _get_onboarding().handle(state, user_msg)
         response = result.get("response", "")
         updates = result.get("state_updates", {})
     except Exception:
@@ -158,29 +233,36 @@ async def onboarding_node(state: TripState) -> dict:
     if routing_echo:
         response = f"{routing_echo}\n\n{response}"
 
+    history = _history_turn(user_msg, response, "onboarding", datetime.now(timezone.utc).isoformat())
     output = {
-        "messages": [{"role": "assistant", "content": response}],
+        "messages": history[-1:],
+        "conversation_history": history,
         **updates,
-        "_next": END,
+        **_TURN_DONE,
     }
     return output
 
 
-async def _specialist_node(agent_name: str, state: TripState) -> dict:
-    """Generic specialist agent node."""
-    agent = _get_agent(agent_name)
+_AGENT_ERROR_MESSAGES = {
+    "research": "I had trouble researching that. Try again or try a specific city.",
+    "planner": "I had trouble generating the plan. Try /plan again.",
+    "scheduler": "I had trouble building the agenda. Try /agenda again.",
+    "feedback": "I had trouble processing your feedback. Try /feedback again.",
+    "cost": "I had trouble with the cost calculation. Try /costs again.",
+}
+
+
+async def _specialist_node(agent_name: str, state: TripState, agent=None) -> dict:
+    """Generic specialist agent node. *agent* skips the ``_get_agent`` lookup when given."""
+    if agent is None:
+        agent = _get_agent(agent_name)
     if not agent:
         return {
             "messages": [{"role": "assistant", "content": f"The {agent_name} agent is not available yet."}],
-            "_next": END,
+            **_TURN_DONE,
         }
 
-    user_msg = state.get("_user_message", "")
-    if not user_msg:
-        msgs = state.get("messages", [])
-        if msgs:
-            last = msgs[-1]
-            user_msg = last.get("content", "") if isinstance(last, dict) else getattr(last, "content", "")
+    user_msg = state["_user_message"]
 
     try:
         result = await agent.handle(state, user_msg)
@@ -188,14 +270,7 @@ async def _specialist_node(agent_name: str, state: TripState) -> dict:
         updates = result.get("state_updates", {})
     except Exception:
         logger.exception("Error in %s agent", agent_name)
-        _agent_error_messages = {
-            "research": "I had trouble researching that. Try again or try a specific city.",
-            "planner": "I had trouble generating the plan. Try /plan again.",
-            "scheduler": "I had trouble building the agenda. Try /agenda again.",
-            "feedback": "I had trouble processing your feedback. Try /feedback again.",
-            "cost": "I had trouble with the cost calculation. Try /costs again.",
-        }
-        response = _agent_error_messages.get(
+        response = _AGENT_ERROR_MESSAGES.get(
             agent_name, "Something went wrong. Try your last command again."
         )
         updates = {}
@@ -205,29 +280,27 @@ async def _specialist_node(agent_name: str, state: TripState) -> dict:
     if routing_echo:
         response = f"{routing_echo}\n\n{response}"
 
-    history = add_to_conversation_history(state, "user", user_msg)
-    history.append({
-        "role": "assistant",
-        "content": response,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "agent": agent_name,
-    })
+    now_iso = datetime.now(timezone.utc).isoformat()
+    history = _history_turn(user_msg, response, agent_name, now_iso)
 
     # Increment loopback depth
     loopback_depth = state.get("_loopback_depth", 0) + 1
 
     output = {
-        "messages": [{"role": "assistant", "content": response}],
+        "messages": history[-1:],
         "conversation_history": history,
         "current_agent": agent_name,
-        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": now_iso,
         "_loopback_depth": loopback_depth,
         **updates,
-        "_next": END,
+        **_TURN_DONE,
     }
 
     # v2: Check for loopback signals in state_updates
     if agent_name in LOOPBACK_AGENTS:
+        if updates.get("_awaiting_input") or updates.get("_delegate_to"):
+            output["_user_message"] = user_msg  # the turn continues on the same message
+
         if updates.get("_awaiting_input"):
             output["_awaiting_input"] = updates["_awaiting_input"]
             return Command(update=output, goto="orchestrator")
@@ -243,6 +316,57 @@ async def _specialist_node(agent_name: str, state: TripState) -> dict:
     return output
 
 
+async def fan_out_worker_node(state: TripState) -> dict:
+    """Run one specialist of a parallel fan-out. Receives its agent name via the Send payload."""
+    agent_name = state["_fan_out_agent"]
+    agent = _get_agent(agent_name)
+    try:
+        result = await agent.handle(state, state.get("_user_message", ""))
+        response = result.get("response", "")
+        updates = result.get("state_updates", {})
+    except Exception:
+        logger.exception("Error in %s agent (fan-out)", agent_name)
+        response = _AGENT_ERROR_MESSAGES.get(
+            agent_name, "Something went wrong. Try your last command again."
+        )
+        updates = {}
+    return {"_fan_out_results": [{"agent": agent_name, "response": response, "state_updates": updates}]}
+
+
+async def fan_in_node(state: TripState) -> dict:
+    """Merge parallel specialist results into a single reply and state update."""
+    order = state.get("_fan_out") or []
+    results = sorted(
+        state.get("_fan_out_results") or [],
+        key=lambda r: order.index(r["agent"]) if r["agent"] in order else len(order),
+    )
+
+    # Shallow merge — PARALLEL_SAFE_AGENTS write disjoint keys (see constants)
+    updates: dict = {}
+    for r in results:
+        updates.update(r["state_updates"])
+    response = "\n\n".join(r["response"] for r in results if r["response"])
+
+    routing_echo = state.get("_routing_echo", "")
+    if routing_echo:
+        response = f"{routing_echo}\n\n{response}"
+
+    lead_agent = order[0] if order else "orchestrator"
+    now_iso = datetime.now(timezone.utc).isoformat()
+    history = _history_turn(state.get("_user_message", ""), response, lead_agent, now_iso)
+
+    return {
+        "messages": history[-1:],
+        "conversation_history": history,
+        "current_agent": lead_agent,
+        "updated_at": now_iso,
+        **updates,
+        "_fan_out": None,
+        "_fan_out_results": None,
+        **_TURN_DONE,
+    }
+
+
 async def error_handler_node(state: TripState) -> dict:
     """Handle errors from specialist agents."""
     error_agent = state.get("_error_agent", "unknown")
@@ -251,7 +375,7 @@ async def error_handler_node(state: TripState) -> dict:
         "messages": [{"role": "assistant", "content": f"I ran into an issue with {error_agent}. {error_context} Please try again."}],
         "_error_agent": None,
         "_error_context": None,
-        "_next": END,
+        **_TURN_DONE,
     }
 
 
@@ -259,8 +383,14 @@ async def error_handler_node(state: TripState) -> dict:
 
 
 def _make_specialist_node(name: str):
+    """Build the node for one specialist; the agent is resolved on first run and kept in the closure."""
+    agent = None
+
     async def node_fn(state: TripState) -> dict:
-        return await _specialist_node(name, state)
+        nonlocal agent
+        if agent is None:
+            agent = _get_agent(name)
+        return await _specialist_node(name, state, agent)
     node_fn.__name__ = f"{name}_node"
     return node_fn
 
@@ -268,13 +398,17 @@ def _make_specialist_node(name: str):
 # ─── Routing ─────────────────────────────────────
 
 
-def route_from_orchestrator(state: TripState) -> str:
+def route_from_orchestrator(state: TripState) -> str | list[Send]:
     """Conditional edge — read _next from state to decide the next node."""
     next_node = state.get("_next", END)
     if next_node == END or next_node == "orchestrator":
         return END
-    valid = {"onboarding", "research", "prioritizer", "planner", "scheduler", "feedback", "cost", "error_handler"}
-    return next_node if next_node in valid else END
+    if next_node == "fan_out":
+        targets = state.get("_fan_out") or []
+        if not targets:
+            return END
+        return [Send("fan_out_worker", {**state, "_fan_out_agent": name}) for name in targets]
+    return next_node if next_node in ORCH_TARGETS else END
 
 
 def route_from_specialist(state: TripState) -> str:
@@ -306,6 +440,10 @@ def build_graph(checkpointer=None) -> StateGraph:
             continue  # already added above
         graph.add_node(agent_name, _make_specialist_node(agent_name))
 
+    # Parallel fan-out: one worker per Send, merged by fan_in
+    graph.add_node("fan_out_worker", fan_out_worker_node)
+    graph.add_node("fan_in", fan_in_node)
+
     # Add error handler node
     graph.add_node("error_handler", error_handler_node)
 
@@ -313,51 +451,50 @@ def build_graph(checkpointer=None) -> StateGraph:
     graph.set_entry_point("orchestrator")
 
     # Conditional edges from orchestrator
-    graph.add_conditional_edges(
-        "orchestrator",
-        route_from_orchestrator,
-        {
-            "onboarding": "onboarding",
-            "research": "research",
-            "prioritizer": "prioritizer",
-            "planner": "planner",
-            "scheduler": "scheduler",
-            "feedback": "feedback",
-            "cost": "cost",
-            "error_handler": "error_handler",
-            END: END,
-        },
-    )
+    graph.add_conditional_edges("orchestrator", route_from_orchestrator, ORCH_ROUTE_MAP)
 
     # Onboarding always ends after processing
     graph.add_edge("onboarding", END)
 
     # Loopback agents get conditional edges
     for agent_name in LOOPBACK_AGENTS:
-        graph.add_conditional_edges(
-            agent_name,
-            route_from_specialist,
-            {
-                "error_handler": "error_handler",
-                END: END,
-                **{a: a for a in SPECIALIST_AGENTS if a != "onboarding"},
-            },
-        )
+        graph.add_conditional_edges(agent_name, route_from_specialist, LOOPBACK_ROUTE_MAP)
 
     # Non-loopback specialist agents get direct edge to END
-    non_loopback = SPECIALIST_AGENTS - LOOPBACK_AGENTS - {"onboarding"}
-    for agent_name in non_loopback:
+    for agent_name in NON_LOOPBACK_AGENTS:
         graph.add_edge(agent_name, END)
 
+    # Fan-out workers converge on fan_in, which ends the turn
+    graph.add_edge("fan_out_worker", "fan_in")
+    graph.add_edge("fan_in", END)
+
     # Error handler always ends
     graph.add_edge("error_handler", END)
 
     return graph
 
 
-def compile_graph(checkpointer=None):
-    """Compile the graph with an optional checkpointer."""
+def prewarm_agents() -> list:
+    """Construct every specialist agent up front so the first request skips cold-start cost."""
+    agents = [_get_orchestrator(), _get_onboarding()]
+    agents.extend(_get_agent(name) for name in SPECIALIST_AGENTS - {"onboarding"})
+    return agents
+
+
+async def warmup_agents() -> None:
+    """Run each agent's async warmup hook concurrently."""
+    await asyncio.gather(*(agent.warmup() for agent in prewarm_agents()))
+
+
+def compile_graph(checkpointer=None, prewarm: bool = False):
+    """Compile the graph with an optional checkpointer.
+
+    With ``prewarm=True`` all specialist agents are instantiated eagerly.
+    """
     graph = build_graph(checkpointer)
     compiled = graph.compile(checkpointer=checkpointer)
     logger.info("LangGraph compiled with %d nodes.", len(graph.nodes))
+    if prewarm:
+        prewarm_agents()
+        logger.info("Specialist agents pre-warmed.")
     return compiled
@@ -6,10 +6,26 @@ import asyncio
 import logging
 import logging.handlers
 import os
+import queue
 import sys
 
 from dotenv import load_dotenv
 
+# Checkpoint writes happen once per graph step; WAL (set by the saver's own
+# setup) plus these keep them cheap: fsync only at checkpoints, mmap'd reads.
+_CHECKPOINT_PRAGMAS = """
+PRAGMA synchronous=NORMAL;
+PRAGMA mmap_size=268435456;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-65536;
+"""
+
+
+async def _tune_checkpointer(checkpointer) -> None:
+    """Create the checkpoint tables (enabling WAL) and apply connection PRAGMAs."""
+    await checkpointer.setup()
+    await checkpointer.conn.executescript(_CHECKPOINT_PRAGMAS)
+
 
 def main() -> None:
     load_dotenv()
@@ -28,28 +44,42 @@ def main() -> None:
     console.setFormatter(logging.Formatter(log_format))
     root_logger.addHandler(console)
 
-    # File handler (rotating, persistent)
+    # File handler (rotating, persistent) — written from a listener thread so
+    # file I/O and rollover never block the event loop
     file_handler = logging.handlers.RotatingFileHandler(
         "data/logs/bot.log", maxBytes=5_000_000, backupCount=3
     )
     file_handler.setFormatter(logging.Formatter(log_format))
-    root_logger.addHandler(file_handler)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+    log_listener.start()
 
     logger = logging.getLogger(__name__)
 
     async def _start() -> None:
-        # 1. Init database
-        from src.db.migrations import init_db
-        repo = await init_db(settings.DATABASE_URL)
-        logger.info("Database ready.")
-
-        # 2. Compile LangGraph with async SQLite checkpointer
+        import aiosqlite
         from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
-        from src.graph import compile_graph
+        from src.db.checkpoint_serde import CompressedSerializer
+        from src.db.migrations import init_db
+        from src.graph import compile_graph, warmup_agents
+        from src.tools.currency import close_http_client
         os.makedirs("data", exist_ok=True)
 
-        async with AsyncSqliteSaver.from_conn_string("data/checkpoints.db") as checkpointer:
-            graph = compile_graph(checkpointer=checkpointer)
+        async with aiosqlite.connect("data/checkpoints.db") as checkpoint_conn:
+            checkpointer = AsyncSqliteSaver(checkpoint_conn, serde=CompressedSerializer())
+            await _tune_checkpointer(checkpointer)
+            # 1+2. Init database and compile LangGraph concurrently — the compile
+            # (and agent pre-warm) is synchronous, so it runs in a worker thread.
+            repo, graph = await asyncio.gather(
+                init_db(settings.DATABASE_URL),
+                asyncio.to_thread(
+                    compile_graph, checkpointer=checkpointer, prewarm=settings.PREWARM_AGENTS
+                ),
+            )
+            logger.info("Database ready.")
+            if settings.PREWARM_AGENTS:
+                await warmup_agents()
             logger.info("LangGraph compiled.")
 
             # 3. Create and run Telegram bot
@@ -57,8 +87,9 @@ def main() -> None:
             app = create_bot(graph, repo)
             logger.info("Starting Telegram bot polling...")
 
-            async with app:
-                await app.initialize()
+            # Telegram init (getMe) and DB pool warmup are independent round trips
+            await asyncio.gather(app.initialize(), repo.warmup())
+            async with app:  # already initialized — __aenter__ is a no-op here
                 await app.start()
                 await app.updater.start_polling(drop_pending_updates=True)
 
@@ -83,11 +114,22 @@ def main() -> None:
                 await app.updater.stop()
                 await app.stop()
                 await repo.close()
+                await close_http_client()
+
+    # uvloop (optional "speed" extra) gives a faster event loop where available
+    try:
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+    except ImportError:
+        loop_factory = None
 
     try:
-        asyncio.run(_start())
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            runner.run(_start())
     except KeyboardInterrupt:
         logger.info("Bot stopped.")
+    finally:
+        log_listener.stop()
 
 
 if __name__ == "__main__":
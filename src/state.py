@@ -9,7 +9,9 @@ Enums use str mixin for easy serialisation.
 from __future__ import annotations
 
 from enum import Enum
-from typing import Optional, TypedDict
+from typing import Annotated, Optional, TypedDict
+
+from src.agents.constants import CONVERSATION_HISTORY_WINDOW
 
 
 # ─── Enums ────────────────────────────────────────
@@ -409,6 +411,8 @@ class LibraryConfig(TypedDict, total=False):
 
 
 class Message(TypedDict, total=False):
+    """Canonical message shape for both ``messages`` and ``conversation_history``."""
+
     role: str
     content: str
     timestamp: str
@@ -418,6 +422,25 @@ class Message(TypedDict, total=False):
 # ═══ ROOT STATE ══════════════════════════════════
 
 
+def merge_conversation_history(existing: list | None, new: list | None) -> list:
+    """Reducer for ``conversation_history`` — nodes return only the new entries.
+
+    Deltas are appended and the result is bounded to the most recent
+    CONVERSATION_HISTORY_WINDOW entries.
+    """
+    existing = existing or []
+    if not new:
+        return existing
+    return (existing + new)[-CONVERSATION_HISTORY_WINDOW:]
+
+
+def collect_fan_out_results(existing: list | None, new: list | None) -> list:
+    """Reducer for parallel specialist results — concatenates; ``None`` resets."""
+    if new is None:
+        return []
+    return (existing or []) + new
+
+
 class TripState(TypedDict, total=False):
     """Root state object for LangGraph. TypedDict at root, typed nested dicts."""
 
@@ -466,14 +489,14 @@ class TripState(TypedDict, total=False):
 
     # Conversation management
     current_agent: str
-    conversation_history: list[Message]
+    conversation_history: Annotated[list[Message], merge_conversation_history]
     onboarding_complete: bool
     onboarding_step: Optional[int]
     current_trip_day: Optional[int]
     agent_scratch: dict
 
     # LangGraph messages (for internal LLM conversation)
-    messages: list
+    messages: list[Message]
 
     # Internal routing (used by graph nodes)
     _next: str
@@ -489,5 +512,10 @@ class TripState(TypedDict, total=False):
     _error_context: Optional[str]
     _loopback_depth: int
 
+    # Parallel fan-out (several independent specialists for one message)
+    _fan_out: Optional[list[str]]
+    _fan_out_agent: str  # set per worker via the Send payload
+    _fan_out_results: Annotated[list, collect_fan_out_results]
+
     # Progressive profiling (v2)
     onboarding_depth: str  # "minimal" | "standard" | "complete"
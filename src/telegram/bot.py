@@ -7,7 +7,6 @@ import logging
 from telegram.ext import (
     Application,
     CallbackQueryHandler,
-    CommandHandler,
     MessageHandler,
     filters,
 )
@@ -26,26 +25,20 @@ def create_bot(graph, repo) -> Application:
         repo: TripRepository instance.
     """
     settings = get_settings()
-    app = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+    # Updates must be handled one at a time: process_message replies while the turn
+    # is still being saved and relies on the next update waiting for that save
+    app = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).concurrent_updates(False).build()
 
     # Store graph and repo in bot_data for access in handlers
     app.bot_data["graph"] = graph
     app.bot_data["repo"] = repo
 
-    # All slash commands route through the same handler (orchestrator decides)
-    commands = [
-        "start", "research", "library", "priorities", "plan",
-        "agenda", "feedback", "costs", "adjust", "status",
-        "help", "trips", "mytrips", "trip", "join", "summary",
-    ]
-    for cmd in commands:
-        app.add_handler(CommandHandler(cmd, process_message))
-
     # Inline button callbacks (trip switching)
     app.add_handler(CallbackQueryHandler(handle_trip_selection, pattern="^trip_select:"))
 
-    # Plain text messages
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, process_message))
+    # Slash commands and plain text share one handler — process_message parses the
+    # command and the orchestrator decides (unknown commands get a /help hint)
+    app.add_handler(MessageHandler(filters.TEXT, process_message))
 
     # Register proactive nudge job (runs every 6 hours)
     if app.job_queue is not None:
@@ -53,5 +46,5 @@ def create_bot(graph, repo) -> Application:
         app.job_queue.run_repeating(nudge_check, interval=21600, first=60)
         logger.info("Proactive nudge job registered (6h interval).")
 
-    logger.info("Telegram bot configured with %d command handlers.", len(commands))
+    logger.info("Telegram bot configured.")
     return app
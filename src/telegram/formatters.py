@@ -2,8 +2,39 @@
 
 from __future__ import annotations
 
+from types import MappingProxyType
+
 from src.tools.currency import format_dual, format_local, format_usd, is_zero_decimal
 
+# Shared read-only fallback for missing nested dicts (avoids a fresh {} per lookup)
+_EMPTY = MappingProxyType({})
+
+# Icon and label lookups (static — built once at import)
+_TIER_ICON = {"must_do": "🔴", "nice_to_have": "🟡", "if_nearby": "🟢"}
+_MEAL_ORDER = ("breakfast", "lunch", "dinner")
+_MEAL_ICON = {"breakfast": "🌅", "lunch": "☀️", "dinner": "🌙"}
+_URGENCY_ICON = {"book_now": "🔴", "book_today": "🟡", "walk_in": "🟢"}
+_URGENCY_LEGEND = {"book_now": "reserve today", "book_today": "reserve this week", "walk_in": "no reservation needed"}
+_STATUS_EMOJI = {"under_budget": "✅", "on_track": "📊", "over_budget": "⚠️"}
+_CATEGORY_ICONS = {
+    "accommodation": "🏨", "food": "🍽️", "activities": "🎟️",
+    "transport": "🚗", "shopping": "🛍️", "wellness": "💆", "misc": "📱",
+}
+_CATEGORY_LABEL = {cat: cat.title() for cat in _CATEGORY_ICONS}
+
+_BUDGET_HEADER_TMPL = """\
+💰 BUDGET REPORT — Day {day} of {total_days}
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+📊 OVERALL
+   Budget:    {budget}
+   Spent:     {spent} ({pct}%)
+   Remaining: {remaining}
+   Daily avg: {daily_avg}
+   On track?  {status_emoji}
+
+   [{progress_bar}] {pct}%"""
+
 
 def format_money(amount: float | None, symbol: str = "$", code: str = "USD") -> str:
     """Format money with proper decimals for any currency."""
@@ -24,10 +55,17 @@ def format_dual_currency(
     return format_dual(amount_local, symbol, code, rate)
 
 
+# Bound on first /status — agent modules import this one, so not at module top
+_generate_status = None
+
+
 def format_status_dashboard(state: dict) -> str:
     """Build the /status dashboard from state."""
-    from src.agents.orchestrator import generate_status
-    return generate_status(state)
+    global _generate_status
+    if _generate_status is None:
+        from src.agents.orchestrator import generate_status
+        _generate_status = generate_status
+    return _generate_status(state)
 
 
 def format_day_plan(day: dict, dest: dict) -> str:
@@ -51,19 +89,17 @@ def format_day_plan(day: dict, dest: dict) -> str:
     if activities:
         lines.append("Key Activities:")
         for act in activities:
-            tier_icon = {"must_do": "🔴", "nice_to_have": "🟡", "if_nearby": "🟢"}.get(
-                act.get("tier", ""), "⚪"
-            )
+            tier_icon = _TIER_ICON.get(act.get("tier", ""), "⚪")
             lines.append(f"  {tier_icon} {act.get('name', '?')}")
 
-    meals = day.get("meals", {})
+    meals = day.get("meals") or _EMPTY
     if meals:
         lines.append("Meals:")
-        for meal_type in ("breakfast", "lunch", "dinner"):
+        for meal_type in _MEAL_ORDER:
             slot = meals.get(meal_type)
             if slot:
                 name = slot.get("name") or slot.get("type", "explore")
-                icon = {"breakfast": "🌅", "lunch": "☀️", "dinner": "🌙"}.get(meal_type, "🍽️")
+                icon = _MEAL_ICON.get(meal_type, "🍽️")
                 lines.append(f"  {icon} {meal_type.title()}: {name}")
 
     moment = day.get("special_moment")
@@ -119,8 +155,8 @@ def format_agenda_slot(slot: dict, dest: dict) -> str:
 
     booking = slot.get("booking_urgency")
     if booking:
-        urgency_icon = {"book_now": "🔴", "book_today": "🟡", "walk_in": "🟢"}.get(booking, "")
-        legend = {"book_now": "reserve today", "book_today": "reserve this week", "walk_in": "no reservation needed"}.get(booking, "")
+        urgency_icon = _URGENCY_ICON.get(booking, "")
+        legend = _URGENCY_LEGEND.get(booking, "")
         lines.append(f"   {urgency_icon} {booking}" + (f" ({legend})" if legend else ""))
 
     rain = slot.get("rain_backup")
@@ -132,14 +168,14 @@ def format_agenda_slot(slot: dict, dest: dict) -> str:
 
 def format_budget_report(state: dict) -> str:
     """Format the full budget report for Telegram."""
-    dest = state.get("destination", {})
-    tracker = state.get("cost_tracker", {})
+    dest = state.get("destination") or _EMPTY
+    tracker = state.get("cost_tracker") or _EMPTY
     if not tracker:
         return "No budget data yet. Costs will be tracked once your trip is planned."
 
     symbol = dest.get("currency_symbol", "$")
     code = dest.get("currency_code", "USD")
-    totals = tracker.get("totals", {})
+    totals = tracker.get("totals") or _EMPTY
     budget = tracker.get("budget_total_usd", 0)
     spent = totals.get("spent_usd", 0)
     remaining = totals.get("remaining_usd", 0)
@@ -152,50 +188,41 @@ def format_budget_report(state: dict) -> str:
     bar_empty = 20 - bar_filled
     progress_bar = "█" * bar_filled + "░" * bar_empty
 
-    status_emoji = {"under_budget": "✅", "on_track": "📊", "over_budget": "⚠️"}.get(status, "❓")
+    status_emoji = _STATUS_EMOJI.get(status, "❓")
 
-    dates = state.get("dates", {})
+    dates = state.get("dates") or _EMPTY
     current_day = state.get("current_trip_day", 1)
     total_days = dates.get("total_days", "?")
 
-    lines = [
-        f"💰 BUDGET REPORT — Day {current_day} of {total_days}",
-        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
-        "",
-        "📊 OVERALL",
-        f"   Budget:    {format_usd(budget)}",
-        f"   Spent:     {format_usd(spent)} ({pct}%)",
-        f"   Remaining: {format_usd(remaining)}",
-        f"   Daily avg: {format_usd(daily_avg)}",
-        f"   On track?  {status_emoji}",
-        "",
-        f"   [{progress_bar}] {pct}%",
-    ]
-
-    by_category = tracker.get("by_category", {})
+    lines = [_BUDGET_HEADER_TMPL.format_map({
+        "day": current_day,
+        "total_days": total_days,
+        "budget": format_usd(budget),
+        "spent": format_usd(spent),
+        "remaining": format_usd(remaining),
+        "daily_avg": format_usd(daily_avg),
+        "pct": pct,
+        "status_emoji": status_emoji,
+        "progress_bar": progress_bar,
+    })]
+
+    by_category = tracker.get("by_category") or _EMPTY
     if by_category:
         lines.extend(["", "📂 BY CATEGORY"])
-        category_icons = {
-            "accommodation": "🏨", "food": "🍽️", "activities": "🎟️",
-            "transport": "🚗", "shopping": "🛍️", "wellness": "💆", "misc": "📱",
-        }
-        for cat, data in by_category.items():
-            icon = category_icons.get(cat, "•")
-            cat_spent = data.get("spent_usd", 0)
-            lines.append(f"   {icon} {cat.title()}: {format_usd(cat_spent)}")
-
-    by_city = tracker.get("by_city", {})
+        lines.extend(
+            f"   {_CATEGORY_ICONS.get(cat, '•')} {_CATEGORY_LABEL.get(cat) or cat.title()}: {format_usd(data.get('spent_usd', 0))}"
+            for cat, data in by_category.items()
+        )
+
+    by_city = tracker.get("by_city") or _EMPTY
     if by_city:
         lines.extend(["", "📅 BY CITY"])
-        for city, data in by_city.items():
-            city_spent = data.get("spent_usd", 0)
-            lines.append(f"   {city}: {format_usd(city_spent)}")
+        lines.extend(f"   {city}: {format_usd(data.get('spent_usd', 0))}" for city, data in by_city.items())
 
     tips = tracker.get("savings_tips", [])
     if tips:
         lines.extend(["", "💡 TIPS:"])
-        for tip in tips[:5]:
-            lines.append(f"   • {tip}")
+        lines.extend(f"   • {tip}" for tip in tips[:5])
 
     if projected > 0:
         over_under = int(((projected - budget) / budget * 100) if budget > 0 else 0)
@@ -206,45 +233,35 @@ def format_budget_report(state: dict) -> str:
 
 
 def split_message(text: str, max_length: int = 4096) -> list[str]:
-    """Split a long message at paragraph boundaries to fit Telegram's limit."""
+    """Split a long message at paragraph boundaries to fit Telegram's limit.
+
+    Each chunk ends at the last blank line inside the window, falling back to
+    the last newline and then a hard split, so the text is scanned with
+    ``str.rfind`` rather than rebuilt paragraph by paragraph.
+    """
     if len(text) <= max_length:
         return [text]
 
     parts: list[str] = []
-    current = ""
-
-    for paragraph in text.split("\n\n"):
-        if len(current) + len(paragraph) + 2 > max_length:
-            if current:
-                parts.append(current.strip())
-                current = ""
-            # If a single paragraph exceeds limit, split at newlines or hard-split
-            if len(paragraph) > max_length:
-                for line in paragraph.split("\n"):
-                    # Hard-split individual lines that exceed the limit
-                    while len(line) > max_length:
-                        chunk = line[:max_length]
-                        if current:
-                            parts.append(current.strip())
-                            current = ""
-                        parts.append(chunk)
-                        line = line[max_length:]
-                    if len(current) + len(line) + 1 > max_length:
-                        if current:
-                            parts.append(current.strip())
-                        current = line
-                    else:
-                        current = current + "\n" + line if current else line
-            else:
-                current = paragraph
-        else:
-            current = current + "\n\n" + paragraph if current else paragraph
-
-    if current.strip():
-        parts.append(current.strip())
-
-    if not parts:
-        # No paragraph boundaries — hard-split at max_length
-        return [text[i:i + max_length] for i in range(0, len(text), max_length)]
-
+    start, n = 0, len(text)
+    while n - start > max_length:
+        limit = start + max_length
+        end = text.rfind("\n\n", start, limit)
+        sep = 2
+        if end <= start:
+            end = text.rfind("\n", start, limit)
+            sep = 1
+        if end <= start:
+            # No line boundary in the window — hard-split at max_length
+            parts.append(text[start:limit])
+            start = limit
+            continue
+        chunk = text[start:end].strip()
+        if chunk:
+            parts.append(chunk)
+        start = end + sep
+
+    tail = text[start:].strip()
+    if tail:
+        parts.append(tail)
     return parts
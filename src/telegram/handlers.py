@@ -3,23 +3,96 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
-
+import time
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from secrets import token_hex
+from types import MappingProxyType
+
+import orjson
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import HumanMessage as HMsg
+from langchain_core.messages import SystemMessage as SMsg
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.constants import ChatAction
 from telegram.ext import ContextTypes
 
+from src.agents.constants import CONVERSATION_HISTORY_WINDOW, NOTES_ELIGIBLE_AGENTS
+from src.agents.orchestrator import generate_help, generate_status
+from src.db.persistence import listing_projection
 from src.telegram.formatters import split_message
+from src.tools.library_sync import library_sync
+from src.tools.trip_memory import append_agent_notes, build_and_write_agent_memory, read_agent_notes
+from src.tools.trip_synthesis import synthesize_trip
 
 logger = logging.getLogger(__name__)
 
+# Trip state_json is parsed on every message and for each trip in listings
+_loads = orjson.loads
+
+# Read-only fallback for missing nested dicts in listing code
+_EMPTY = MappingProxyType({})
+
+# Seconds a confirmed trip-access check is reused for inline trip switching
+_ACCESS_CACHE_TTL = 60
+
+# Seconds a rendered /trips listing is reused (bounds staleness from other members' edits)
+_TRIPS_CACHE_TTL = 30
+
 # Internal state keys that should not be persisted to the trip repo
-_INTERNAL_KEYS = {
+_INTERNAL_KEYS = frozenset({
     "_next", "_user_message", "messages", "_awaiting_input", "_callback",
     "_delegate_to", "_chain", "_routing_echo", "_error_agent", "_error_context",
-    "_loopback_depth",
-}
+    "_loopback_depth", "_fan_out", "_fan_out_results",
+})
+
+
+def _persistable(state: dict) -> dict:
+    """Copy *state* without the internal graph keys (only the few present are dropped)."""
+    clean = dict(state)
+    for key in _INTERNAL_KEYS.intersection(clean):
+        del clean[key]
+    return clean
+
+
+def _has_checkpoint(snapshot, trip_id: str) -> bool:
+    """Whether an ``aget_state`` result holds channel values for the thread.
+
+    A failed probe counts as present — better to miss a reseed than to append
+    the stored history on top of the checkpointed one.
+    """
+    if isinstance(snapshot, Exception):
+        logger.warning("Checkpoint probe failed for trip %s: %s", trip_id, snapshot)
+        return True
+    return bool(snapshot.values)
+
+
+def _listing_state(trip) -> dict:
+    """Display fields for *trip* (title, destination, cities, dates, progress).
+
+    Reads the small listing projection the repo keeps next to state_json; rows
+    saved before it existed are projected from the full state.
+    """
+    if trip.listing_json:
+        return _loads(trip.listing_json)
+    if trip.state_json:
+        return listing_projection(_loads(trip.state_json))
+    return {}
+
+
+async def _reply(message, text: str) -> None:
+    """Send text, split across messages only when it exceeds Telegram's limit.
+
+    Parts go out sequentially so they arrive in order.
+    """
+    if len(text) <= 4096:
+        await message.reply_text(text)
+        return
+    for part in split_message(text):
+        await message.reply_text(part)
+
 
 COMMAND_DISPATCH = {
     "/start": "onboarding",
@@ -33,6 +106,52 @@ COMMAND_DISPATCH = {
 }
 
 
+async def _cmd_status(update: Update, state: dict, repo, trip_id: str) -> None:
+    """/status — dashboard rendered straight from state."""
+    await _reply(update.message, generate_status(state))
+
+
+async def _cmd_help(update: Update, state: dict, repo, trip_id: str) -> None:
+    """/help — static command reference."""
+    await _reply(update.message, generate_help())
+
+
+async def _cmd_library(update: Update, state: dict, repo, trip_id: str) -> None:
+    """/library — sync the trip to the markdown library and persist its config."""
+    try:
+        sync_result = await library_sync(state)
+        state_to_save = _persistable(state)
+        if sync_result.get("library"):
+            state_to_save["library"] = sync_result["library"]
+        if repo:
+            existing = await repo.get_trip(trip_id)
+            if existing:
+                await repo.merge_state(trip_id, state_to_save)
+        await _reply(update.message, sync_result.get("response", "Library synced."))
+    except Exception:
+        logger.exception("Library sync failed")
+        await update.message.reply_text("Library sync failed. Try again later.")
+
+
+async def _cmd_summary(update: Update, state: dict, repo, trip_id: str) -> None:
+    """/summary — synthesized trip overview."""
+    try:
+        summary = await synthesize_trip(state)
+        await _reply(update.message, summary)
+    except Exception:
+        logger.exception("Trip synthesis failed")
+        await update.message.reply_text("Could not generate summary. Try /status instead.")
+
+
+# Slash commands answered without invoking the graph
+_DIRECT_COMMANDS = {
+    "/status": _cmd_status,
+    "/help": _cmd_help,
+    "/library": _cmd_library,
+    "/summary": _cmd_summary,
+}
+
+
 async def _keep_typing(chat) -> None:
     """Send typing indicator every 4 seconds until cancelled."""
     try:
@@ -54,10 +173,17 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     user_id = str(update.effective_user.id)
     message_text = update.message.text.strip()
-    logger.info("Received message from user %s: %.80s", user_id, message_text)
 
-    # Send typing indicator while processing
-    await update.message.chat.send_action(ChatAction.TYPING)
+    # Command word, parsed once. Group chats address commands as /cmd@BotName;
+    # drop the mention so dispatch and argument parsing see the bare command.
+    cmd = ""
+    if message_text.startswith("/"):
+        first, *rest = message_text.split(maxsplit=1)
+        if "@" in first:
+            first = first.split("@", 1)[0]
+            message_text = " ".join([first, *rest])
+        cmd = first.lower()
+    logger.info("Received message from user %s: %.80s", user_id, message_text)
 
     graph = context.bot_data.get("graph")
     repo = context.bot_data.get("repo")
@@ -70,37 +196,69 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     trip_id = context.user_data.get("active_trip_id", "default")
     thread_id = trip_id
 
+    if cmd in ("/trips", "/mytrips"):
+        await _list_mytrips(update, context, user_id, repo)
+        return
+
+    # Anything else may change what the trip listing shows
+    context.user_data.pop("_trips_cache", None)
+
     # Handle /join command
-    if message_text.startswith("/join"):
+    if cmd == "/join":
         await _handle_join(update, context, user_id, message_text, repo)
         return
 
     # Special handling for trip management commands
-    if message_text.startswith("/trip") and not message_text.startswith("/trips"):
+    if cmd == "/trip":
         result = await _handle_trip_management(update, context, user_id, message_text, repo)
         if result:
             return
 
-    if message_text in ("/trips", "/mytrips"):
-        await _list_mytrips(update, context, user_id, repo)
-        return
-
-    # Start a background typing indicator refresh task
-    typing_task = asyncio.create_task(_keep_typing(update.message.chat))
+    # Typing refresh only for the graph path; direct commands answer before it would fire
+    typing_task = None
+    reply_task = None
+    saved = save_failed = False
 
     # Invoke the LangGraph
     try:
         config = {"configurable": {"thread_id": thread_id}}
 
-        # Load prior state from trip repo as fallback for stale checkpointer
-        input_state: dict = {"messages": [{"role": "user", "content": message_text}]}
+        # Messages enter the graph in canonical Message shape — role and content
+        # always present — so nodes index them directly
+        incoming = [{"role": "user", "content": message_text}]
+
+        # Typing indicator, prior-state load (fallback for a stale checkpointer) and,
+        # for graph turns, the checkpoint probe are independent round trips — run
+        # them concurrently
+        pending = [update.message.chat.send_action(ChatAction.TYPING)]
         if repo:
+            pending.append(repo.get_trip(trip_id))
+            if cmd not in _DIRECT_COMMANDS:
+                pending.append(graph.aget_state(config))
+        typing_sent, *loaded = await asyncio.gather(*pending, return_exceptions=True)
+        if isinstance(typing_sent, Exception):
+            logger.warning("Failed to send typing indicator: %s", typing_sent)
+
+        input_state: dict = {"messages": incoming}
+        if loaded:
+            existing_trip = loaded[0]
             try:
-                existing_trip = await repo.get_trip(trip_id)
+                if isinstance(existing_trip, Exception):
+                    raise existing_trip
                 if existing_trip and existing_trip.state_json:
-                    prior_state = json.loads(existing_trip.state_json)
-                    # Spread prior state under input; input overrides checkpointer
-                    input_state = {**prior_state, "messages": [{"role": "user", "content": message_text}]}
+                    prior_state = _loads(existing_trip.state_json)
+                    # Spread prior state under input; input overrides checkpointer.
+                    # conversation_history is a reducer channel: when the checkpointer
+                    # holds this thread, re-sending it would append it again. Without
+                    # a checkpoint (e.g. checkpoints.db lost) the full message log
+                    # seeds it, falling back to the window stored with the state.
+                    if len(loaded) < 2 or _has_checkpoint(loaded[1], trip_id):
+                        prior_state.pop("conversation_history", None)
+                    else:
+                        logged = await repo.recent_history(trip_id, CONVERSATION_HISTORY_WINDOW)
+                        if logged:
+                            prior_state["conversation_history"] = logged
+                    input_state = {**prior_state, "messages": incoming}
                     logger.info("Loaded prior state for trip %s (keys: %s)", trip_id, list(prior_state.keys()))
             except Exception:
                 logger.exception("Failed to load prior state for trip %s", trip_id)
@@ -112,57 +270,22 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         input_state["_error_context"] = None
 
         # Pre-graph slash command dispatch (v2)
-        if message_text.startswith("/"):
-            cmd = message_text.split()[0].lower()
-
+        if cmd:
             # Direct handlers (skip graph entirely)
-            if cmd == "/status":
-                from src.agents.orchestrator import generate_status
-                status = generate_status(input_state)
-                for part in split_message(status):
-                    await update.message.reply_text(part)
-                return
-            if cmd == "/help":
-                from src.agents.orchestrator import generate_help
-                for part in split_message(generate_help()):
-                    await update.message.reply_text(part)
+            direct = _DIRECT_COMMANDS.get(cmd)
+            if direct:
+                await direct(update, input_state, repo, trip_id)
                 return
-            if cmd == "/library":
-                try:
-                    from src.tools.library_sync import library_sync
-                    sync_result = await library_sync(input_state)
-                    state_to_save = {k: v for k, v in input_state.items() if k not in _INTERNAL_KEYS}
-                    if sync_result.get("library"):
-                        state_to_save["library"] = sync_result["library"]
-                    if repo:
-                        existing = await repo.get_trip(trip_id)
-                        if existing:
-                            await repo.merge_state(trip_id, state_to_save)
-                    for part in split_message(sync_result.get("response", "Library synced.")):
-                        await update.message.reply_text(part)
-                    return
-                except Exception:
-                    logger.exception("Library sync failed")
-                    await update.message.reply_text("Library sync failed. Try again later.")
-                    return
-            if cmd == "/summary":
-                try:
-                    from src.tools.trip_synthesis import synthesize_trip
-                    summary = await synthesize_trip(input_state)
-                    for part in split_message(summary):
-                        await update.message.reply_text(part)
-                    return
-                except Exception:
-                    logger.exception("Trip synthesis failed")
-                    await update.message.reply_text("Could not generate summary. Try /status instead.")
-                    return
 
             # Pre-set _next for command dispatch
             if cmd in COMMAND_DISPATCH:
                 input_state["_next"] = COMMAND_DISPATCH[cmd]
 
+        typing_task = asyncio.create_task(_keep_typing(update.message.chat))
         logger.info("Invoking graph for thread %s", thread_id)
-        result = await graph.ainvoke(input_state, config=config)
+        # One checkpoint per turn: intermediate steps (orchestrator → specialist →
+        # loopbacks) are not persisted, only the state when the run exits
+        result = await graph.ainvoke(input_state, config=config, durability="exit")
         logger.info(
             "Graph returned for thread %s (keys: %s, current_agent: %s)",
             thread_id,
@@ -176,67 +299,59 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Save state to DB if we have a repo — merge, don't replace
         if repo and result:
             try:
-                state_to_save = {k: v for k, v in result.items() if k not in _INTERNAL_KEYS}
-                existing = await repo.get_trip(trip_id)
-                if existing:
-                    await repo.merge_state(trip_id, state_to_save)
-                else:
-                    await repo.create_trip(trip_id, user_id, state_to_save)
-                logger.info("State saved for trip %s", trip_id)
-
-                # Auto-trigger library_sync for research/planner/feedback
+                state_to_save = _persistable(result)
                 responding_agent = result.get("current_agent", "orchestrator")
+                new_trip_id = result.get("trip_id")
+                if new_trip_id == trip_id:
+                    new_trip_id = None
+
+                # The reply doesn't depend on the write, so send it while saving. The bot
+                # handles updates one at a time (concurrent_updates(False) in bot.py), so
+                # the user's next message still sees the saved state; a failed save is
+                # reported after the reply. Onboarding replies are sent below, before
+                # auto-research.
+                if not new_trip_id and response_text:
+                    reply_task = asyncio.create_task(_reply(update.message, response_text))
+
+                # Auto-trigger library_sync for research/planner/feedback — before the
+                # save, so the library lands in the same write as the rest of the state
                 if responding_agent in {"research", "planner", "feedback"}:
                     try:
-                        from src.tools.library_sync import library_sync
                         sync_result = await library_sync(state_to_save)
                         if sync_result.get("library"):
-                            await repo.merge_state(trip_id, {"library": sync_result["library"]})
+                            state_to_save["library"] = sync_result["library"]
                     except Exception:
                         logger.exception("Auto library sync failed after %s", responding_agent)
 
-                # Update per-agent memory files
-                from src.tools.trip_memory import (
-                    append_agent_notes,
-                    build_and_write_agent_memory,
+                # One transaction: merged state, this turn in the full message log (state
+                # keeps only a window) and, after onboarding, the copy under the new trip id
+                await repo.save_turn(
+                    trip_id,
+                    user_id,
+                    state_to_save,
+                    messages=[
+                        {"role": "user", "content": message_text},
+                        {"role": "assistant", "content": response_text, "agent": responding_agent},
+                    ],
+                    copy_to=new_trip_id,
                 )
+                saved = True
+                logger.info("State saved for trip %s", trip_id)
 
-                responding_agent = result.get("current_agent", "orchestrator")
-                try:
-                    await build_and_write_agent_memory(trip_id, responding_agent, state_to_save)
-                except Exception:
-                    logger.exception("Failed to write agent memory for %s", responding_agent)
-
-                # Generate LLM notes for agents that benefit from accumulated learnings
-                if _should_generate_notes(result, responding_agent):
-                    try:
-                        await _generate_and_append_notes(
-                            trip_id, responding_agent, result, append_agent_notes
-                        )
-                    except Exception:
-                        _log_notes_failure(responding_agent)
+                # Per-agent memory files and LLM notes don't affect the reply — update them
+                # in the background instead of delaying it
+                _spawn(_update_agent_memory(trip_id, responding_agent, state_to_save, result))
 
                 # Update active trip id if onboarding just completed
-                if result.get("trip_id") and result["trip_id"] != trip_id:
-                    new_trip_id = result["trip_id"]
+                if new_trip_id:
                     context.user_data["active_trip_id"] = new_trip_id
+                    logger.info("State migrated to new trip %s", new_trip_id)
 
-                    # Migrate state to the new trip_id so subsequent messages find it
+                    # Create directory for agent memory files; they'll be written on first agent run
                     try:
-                        new_existing = await repo.get_trip(new_trip_id)
-                        if new_existing:
-                            await repo.merge_state(new_trip_id, state_to_save)
-                        else:
-                            await repo.create_trip(new_trip_id, user_id, state_to_save)
-                        # Create directory for agent memory files; they'll be written on first agent run
-                        try:
-                            from pathlib import Path
-                            Path(f"./data/trips/{new_trip_id}").mkdir(parents=True, exist_ok=True)
-                        except Exception:
-                            logger.exception("Failed to create trip directory for %s", new_trip_id)
-                        logger.info("State migrated to new trip %s", new_trip_id)
+                        Path(f"./data/trips/{new_trip_id}").mkdir(parents=True, exist_ok=True)
                     except Exception:
-                        logger.exception("Failed to migrate state to new trip %s", new_trip_id)
+                        logger.exception("Failed to create trip directory for %s", new_trip_id)
 
                     trip_name = result.get("trip_title") or _fallback_title_from_state(result)
                     response_text += (
@@ -247,26 +362,26 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     # Auto-start research after onboarding completes
                     try:
                         # Send onboarding confirmation first, then start research
-                        for part in split_message(response_text):
-                            await update.message.reply_text(part)
+                        await _reply(update.message, response_text)
                         logger.info("Onboarding response sent, auto-starting research for trip %s", new_trip_id)
                         response_text = ""  # Clear so we don't send twice
 
+                        # The new trip id is a fresh thread, so its conversation_history
+                        # starts empty and this seeds it with the onboarding exchange
                         research_input = {**state_to_save, "messages": [{"role": "user", "content": "/research all"}]}
                         research_input["_loopback_depth"] = 0
                         research_config = {"configurable": {"thread_id": new_trip_id}}
-                        research_result = await graph.ainvoke(research_input, config=research_config)
+                        research_result = await graph.ainvoke(
+                            research_input, config=research_config, durability="exit"
+                        )
 
                         research_response = _extract_response(research_result)
                         response_text = research_response
 
                         # Save research state
-                        research_state = {k: v for k, v in research_result.items() if k not in _INTERNAL_KEYS}
+                        research_state = _persistable(research_result)
                         await repo.merge_state(new_trip_id, research_state)
-                        try:
-                            await build_and_write_agent_memory(new_trip_id, "research", research_state)
-                        except Exception:
-                            logger.exception("Failed to write agent memory after auto-research for %s", new_trip_id)
+                        _spawn(_update_agent_memory(new_trip_id, "research", research_state))
                         logger.info("Auto-research completed for trip %s", new_trip_id)
                     except Exception:
                         logger.exception("Auto-research failed for trip %s", new_trip_id)
@@ -277,17 +392,25 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                             )
             except Exception:
                 logger.exception("Failed to save state for trip %s", trip_id)
+                save_failed = not saved
 
     except Exception:
         logger.exception("Error processing message for user %s", user_id)
         response_text = "Something went wrong processing your message. Try again, or use /help to see available commands."
     finally:
-        typing_task.cancel()
+        if typing_task:
+            typing_task.cancel()
 
     # Send response, split if needed (may be empty if already sent during auto-research)
+    if reply_task:
+        await reply_task
+    elif response_text:
+        await _reply(update.message, response_text)
+    if save_failed:
+        await update.message.reply_text(
+            "⚠️ I couldn't save that last update, so I may not remember it. Please send it again."
+        )
     if response_text:
-        for part in split_message(response_text):
-            await update.message.reply_text(part)
         logger.info("Response sent to user %s (%d chars)", user_id, len(response_text))
 
 
@@ -319,20 +442,20 @@ async def _handle_join(
         return
 
     try:
-        await repo.add_member(trip_id, user_id)
+        await repo.add_member(trip_id, user_id, trip=trip)
     except ValueError:
         await update.message.reply_text(f"Trip '{trip_id}' not found. Use /trips to see your trips.")
         return
 
     context.user_data["active_trip_id"] = trip_id
 
-    state = json.loads(trip.state_json) if trip.state_json else {}
-    country = state.get("destination", {}).get("country", "Unknown")
-    flag = state.get("destination", {}).get("flag_emoji", "")
+    state = _listing_state(trip)
+    dest = state.get("destination") or _EMPTY
+    flag = dest.get("flag_emoji", "")
     cities = state.get("cities", [])
     city_names = ", ".join(c.get("name", "") for c in cities) if cities else "not set yet"
 
-    title = state.get("trip_title") or _fallback_title_from_state(state)
+    title = state.get("trip_title") or _fallback_title_from_state(state, dest, cities)
     await update.message.reply_text(
         f"You've joined *{title}*! {flag}\n"
         f"Cities: {city_names}\n\n"
@@ -362,7 +485,7 @@ async def _handle_trip_management(
         if repo:
             trip = await repo.get_trip(active_id)
             if trip and trip.state_json:
-                st = json.loads(trip.state_json)
+                st = _listing_state(trip)
                 title = st.get("trip_title") or _fallback_title_from_state(st)
         await update.message.reply_text(
             f"✈️ *{title}*\n"
@@ -373,8 +496,7 @@ async def _handle_trip_management(
         return True
 
     if sub == "new":
-        import uuid
-        new_id = str(uuid.uuid4())[:8]
+        new_id = token_hex(4)
         context.user_data["active_trip_id"] = new_id
         await update.message.reply_text(
             f"Starting a new trip (ID: {new_id}). Let's plan your next adventure!\n\n"
@@ -388,8 +510,8 @@ async def _handle_trip_management(
             trip = await repo.get_trip(target_id)
             if trip:
                 context.user_data["active_trip_id"] = target_id
-                state = json.loads(trip.state_json) if trip.state_json else {}
-                flag = state.get("destination", {}).get("flag_emoji", "")
+                state = _listing_state(trip)
+                flag = (state.get("destination") or _EMPTY).get("flag_emoji", "")
                 title = state.get("trip_title") or _fallback_title_from_state(state)
                 await update.message.reply_text(f"Switched to: {flag} *{title}* (`{target_id}`)")
             else:
@@ -416,42 +538,15 @@ async def _handle_trip_management(
     return False
 
 
-async def _list_trips(
-    update: Update,
-    context: ContextTypes.DEFAULT_TYPE,
-    user_id: str,
-    repo,
-) -> None:
-    """Handle /trips — list all trips for this user."""
-    if not repo:
-        await update.message.reply_text("No trips found.")
-        return
-
-    trips = await repo.list_trips(user_id)
-    if not trips:
-        await update.message.reply_text("No trips yet. Send /start to plan your first trip!")
-        return
-
-    active_id = context.user_data.get("active_trip_id", "default")
-    lines = ["Your trips:\n"]
-
-    for trip in trips:
-        state = json.loads(trip.state_json) if trip.state_json else {}
-        country = state.get("destination", {}).get("country", "Unknown")
-        flag = state.get("destination", {}).get("flag_emoji", "")
-        role = "[owner]" if trip.user_id == user_id else "[member]"
-        status = "📦 Archived" if trip.archived else "✅ Active"
-        current = " ← current" if trip.trip_id == active_id else ""
-        lines.append(f"  {flag} {country} — {trip.trip_id} {role} {status}{current}")
-
-    lines.append("\nUse /trip switch <id> to change active trip.")
-    await update.message.reply_text("\n".join(lines))
-
+def _fallback_title_from_state(state: dict, dest: dict | None = None, cities: list | None = None) -> str:
+    """Deterministic fallback title for trips that lack a trip_title.
 
-def _fallback_title_from_state(state: dict) -> str:
-    """Deterministic fallback title for trips that lack a trip_title."""
-    dest = state.get("destination", {})
-    cities = state.get("cities", [])
+    Callers that already pulled *dest* / *cities* out of *state* can pass them in.
+    """
+    if dest is None:
+        dest = state.get("destination") or _EMPTY
+    if cities is None:
+        cities = state.get("cities", [])
     country = dest.get("country", "Adventure")
     if cities:
         city_names = " & ".join(c.get("name", "") for c in cities[:2])
@@ -466,14 +561,13 @@ def _format_date_range(start: str, end: str) -> str:
     if not start or not end:
         return ""
     try:
-        from datetime import datetime as _dt
-        s = _dt.strptime(start, "%Y-%m-%d")
-        e = _dt.strptime(end, "%Y-%m-%d")
-        if s.month == e.month:
-            return f"{s.strftime('%b')} {s.day}-{e.day}"
-        return f"{s.strftime('%b')} {s.day} - {e.strftime('%b')} {e.day}"
+        s = date.fromisoformat(start)
+        e = date.fromisoformat(end)
     except (ValueError, TypeError):
         return ""
+    if s.month == e.month:
+        return f"{s:%b} {s.day}-{e.day}"
+    return f"{s:%b} {s.day} - {e:%b} {e.day}"
 
 
 def _trip_progress_indicator(state: dict) -> str:
@@ -491,6 +585,42 @@ def _trip_progress_indicator(state: dict) -> str:
     return "Ready to research"
 
 
+def _format_trip_entry(trip, active_id: str, user_id: str) -> tuple[str, InlineKeyboardButton | None]:
+    """Render one /mytrips entry and its switch button (None for current or archived trips)."""
+    state = _listing_state(trip)
+    dest = state.get("destination") or _EMPTY
+    cities = state.get("cities", [])
+    flag = dest.get("flag_emoji", "")
+    title = state.get("trip_title") or _fallback_title_from_state(state, dest, cities)
+    is_current = trip.trip_id == active_id
+    is_archived = trip.archived
+
+    # Route line: Tokyo > Kyoto > Osaka
+    route = " > ".join(c.get("name", "") for c in cities) if cities else "No cities yet"
+
+    # Date range
+    dates = state.get("dates") or _EMPTY
+    date_range = _format_date_range(dates.get("start", ""), dates.get("end", ""))
+
+    # Progress · role
+    sub_parts = [date_range] if date_range else []
+    sub_parts.append(_trip_progress_indicator(state))
+    sub_parts.append("owner" if trip.user_id == user_id else "member")
+
+    current_tag = " (current)" if is_current else ""
+    archived_tag = " [archived]" if is_archived else ""
+    block = f"{flag} {title}{current_tag}{archived_tag}"
+    if route:
+        block += f"\n   {route}"
+    block += "\n   " + " · ".join(sub_parts)
+
+    # Inline button for non-current, non-archived trips
+    button = None
+    if not is_current and not is_archived:
+        button = InlineKeyboardButton(f"{flag} {title}"[:40], callback_data=f"trip_select:{trip.trip_id}")
+    return block, button
+
+
 async def _list_mytrips(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
@@ -502,65 +632,24 @@ async def _list_mytrips(
         await update.message.reply_text("No trips found.")
         return
 
-    trips = await repo.list_trips(user_id)
-    if not trips:
-        await update.message.reply_text("No trips yet. Send /start to plan your first trip!")
-        return
-
+    # Repeated listings reuse the last render while the active trip is unchanged;
+    # process_message drops it on any other message
     active_id = context.user_data.get("active_trip_id", "default")
-    lines = ["Your trips:\n"]
-    buttons = []
-
-    for trip in trips:
-        state = json.loads(trip.state_json) if trip.state_json else {}
-        dest = state.get("destination", {})
-        flag = dest.get("flag_emoji", "")
-        title = state.get("trip_title") or _fallback_title_from_state(state)
-        is_current = trip.trip_id == active_id
-        is_archived = trip.archived
-
-        # Route line: Tokyo > Kyoto > Osaka
-        cities = state.get("cities", [])
-        route = " > ".join(c.get("name", "") for c in cities) if cities else "No cities yet"
-
-        # Date range
-        dates = state.get("dates", {})
-        date_range = _format_date_range(dates.get("start", ""), dates.get("end", ""))
-
-        # Progress
-        progress = _trip_progress_indicator(state)
-
-        # Role
-        role = "owner" if trip.user_id == user_id else "member"
-
-        # Build display line
-        current_tag = " (current)" if is_current else ""
-        archived_tag = " [archived]" if is_archived else ""
-        header = f"{flag} {title}{current_tag}{archived_tag}"
-        detail_parts = []
-        if route:
-            detail_parts.append(route)
-        sub_parts = []
-        if date_range:
-            sub_parts.append(date_range)
-        sub_parts.append(progress)
-        sub_parts.append(role)
-        if sub_parts:
-            detail_parts.append(" · ".join(sub_parts))
-
-        lines.append(header)
-        for part in detail_parts:
-            lines.append(f"   {part}")
-        lines.append("")
-
-        # Add inline button for non-current, non-archived trips
-        if not is_current and not is_archived:
-            buttons.append(
-                [InlineKeyboardButton(f"{flag} {title}"[:40], callback_data=f"trip_select:{trip.trip_id}")]
-            )
+    now = time.monotonic()
+    cached = context.user_data.get("_trips_cache")
+    if cached and cached[0] > now and cached[1] == active_id:
+        _, _, text, reply_markup = cached
+    else:
+        trips = await repo.list_trips(user_id)
+        if not trips:
+            await update.message.reply_text("No trips yet. Send /start to plan your first trip!")
+            return
 
-    text = "\n".join(lines).strip()
-    reply_markup = InlineKeyboardMarkup(buttons) if buttons else None
+        entries = [_format_trip_entry(trip, active_id, user_id) for trip in trips]
+        text = ("Your trips:\n\n" + "\n\n".join(block for block, _ in entries)).strip()
+        buttons = [[button] for _, button in entries if button is not None]
+        reply_markup = InlineKeyboardMarkup(buttons) if buttons else None
+        context.user_data["_trips_cache"] = (now + _TRIPS_CACHE_TTL, active_id, text, reply_markup)
     await update.message.reply_text(text, reply_markup=reply_markup)
 
 
@@ -586,17 +675,21 @@ async def handle_trip_selection(update: Update, context: ContextTypes.DEFAULT_TY
         await query.edit_message_text(f"Trip '{trip_id}' not found.")
         return
 
-    # Verify user has access (owner or member)
-    user_trips = await repo.list_trips(user_id)
-    accessible_ids = {t.trip_id for t in user_trips}
-    if trip_id not in accessible_ids:
-        await query.edit_message_text("You don't have access to this trip.")
-        return
+    # Verify user has access (owner or member) — reuses the loaded trip, so
+    # owners need no further query and members need one indexed lookup.
+    # Positive checks are remembered briefly so repeated switching skips it.
+    access_cache = context.user_data.setdefault("_trip_access_cache", {})
+    now = time.monotonic()
+    if access_cache.get(trip_id, 0) <= now:
+        if not await repo.is_member(trip_id, user_id, trip=trip):
+            await query.edit_message_text("You don't have access to this trip.")
+            return
+        access_cache[trip_id] = now + _ACCESS_CACHE_TTL
 
     context.user_data["active_trip_id"] = trip_id
 
-    state = json.loads(trip.state_json) if trip.state_json else {}
-    dest = state.get("destination", {})
+    state = _listing_state(trip)
+    dest = state.get("destination") or _EMPTY
     flag = dest.get("flag_emoji", "")
     title = state.get("trip_title") or _fallback_title_from_state(state)
 
@@ -609,20 +702,47 @@ async def handle_trip_selection(update: Update, context: ContextTypes.DEFAULT_TY
 
 # ─── Notes Generation Helpers ────────────────────────────
 
-_notes_failure_counts: dict[str, int] = {}
+_notes_failure_counts: Counter[str] = Counter()
+
+# Post-reply memory/notes tasks; the event loop only keeps weak references
+_background_tasks: set[asyncio.Task] = set()
 
 NOTES_MAX_TOKENS = 300
 NOTES_MODEL = "claude-haiku-4-5-20251001"
 
 
+def _spawn(coro) -> asyncio.Task:
+    """Run *coro* as a fire-and-forget task, holding a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def _update_agent_memory(trip_id: str, agent_name: str, state: dict, result: dict | None = None) -> None:
+    """Rewrite the agent's memory file, then append LLM notes if *result* warrants them.
+
+    Runs off the reply path via _spawn, so failures are logged rather than raised.
+    """
+    try:
+        await build_and_write_agent_memory(trip_id, agent_name, state)
+    except Exception:
+        logger.exception("Failed to write agent memory for %s", agent_name)
+
+    # Generate LLM notes for agents that benefit from accumulated learnings
+    if result is not None and _should_generate_notes(result, agent_name):
+        try:
+            await _generate_and_append_notes(trip_id, agent_name, result, append_agent_notes)
+        except Exception:
+            _log_notes_failure(agent_name)
+
+
 def _should_generate_notes(result: dict, responding_agent: str) -> bool:
     """Check if this response warrants generating agent notes.
 
     Notes are generated when a NOTES_ELIGIBLE agent produces state updates
     in research, planning, or feedback domains.
     """
-    from src.agents.constants import NOTES_ELIGIBLE_AGENTS
-
     if responding_agent not in NOTES_ELIGIBLE_AGENTS:
         return False
     state_updates = result.get("state_updates", result)
@@ -653,11 +773,6 @@ async def _generate_and_append_notes(
     Uses structured bullet format for robust parsing. Deduplicates against existing notes.
     Wraps existing notes in XML delimiters for prompt injection protection.
     """
-    from langchain_anthropic import ChatAnthropic
-    from langchain_core.messages import HumanMessage as HMsg
-    from langchain_core.messages import SystemMessage as SMsg
-    from src.tools.trip_memory import read_agent_notes
-
     existing_notes = read_agent_notes(trip_id, responding_agent) or ""
 
     notes_llm = ChatAnthropic(model=NOTES_MODEL, max_tokens=NOTES_MAX_TOKENS)
@@ -682,17 +797,18 @@ async def _generate_and_append_notes(
     ])
 
     notes_text = notes_response.content.strip()
-    # Extract bullet lines only — ignore any preamble/commentary
-    bullet_lines = [l.strip() for l in notes_text.splitlines() if l.strip().startswith("- ")]
-    # Filter out the "none" signal
-    real_bullets = [l for l in bullet_lines if l.strip().lower() != "- none"]
+    # Keep bullet lines only (ignoring any preamble/commentary), minus the "none" signal
+    real_bullets = [
+        line for line in map(str.strip, notes_text.splitlines())
+        if line.startswith("- ") and line.lower() != "- none"
+    ]
     if real_bullets:
         await append_fn(trip_id, responding_agent, "\n".join(real_bullets))
 
 
 def _log_notes_failure(agent_name: str) -> None:
     """Log notes generation failures — first 3, then every 10th."""
-    _notes_failure_counts[agent_name] = _notes_failure_counts.get(agent_name, 0) + 1
+    _notes_failure_counts[agent_name] += 1
     count = _notes_failure_counts[agent_name]
     if count <= 3 or count % 10 == 0:
         logger.warning(
@@ -707,14 +823,20 @@ def _extract_response(result: dict) -> str:
     if result.get("response"):
         return result["response"]
 
-    # Check messages for the last AI message
+    # Check messages for the last AI message — graph nodes emit Message dicts and
+    # the reply is almost always the final one
     messages = result.get("messages", [])
+    if messages:
+        last = messages[-1]
+        if isinstance(last, dict) and last.get("role") == "assistant":
+            return last.get("content", "")
+
     for msg in reversed(messages):
-        if hasattr(msg, "content") and hasattr(msg, "type"):
-            if msg.type == "ai":
-                return msg.content
-        elif isinstance(msg, dict):
+        # Message dicts are the common shape; LangChain message objects are the fallback
+        if isinstance(msg, dict):
             if msg.get("role") == "assistant":
                 return msg.get("content", "")
+        elif getattr(msg, "type", None) == "ai":
+            return msg.content
 
     return "I'm not sure how to respond to that. Try /help for available commands."
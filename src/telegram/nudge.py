@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
-import json
 import logging
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+_PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+
+def _priority_rank(nudge: dict) -> int:
+    return _PRIORITY_ORDER.get(nudge.get("priority", "low"), 2)
+
 
 async def nudge_check(context) -> None:
     """Periodic nudge job — runs every 6 hours.
@@ -39,11 +44,8 @@ def check_nudge_triggers(state: dict) -> list[dict]:
     nudges = []
     now = datetime.now(timezone.utc)
 
-    # 1. Booking deadline nudge
-    _check_booking_deadlines(state, now, nudges)
-
-    # 2. Research staleness nudge
-    _check_research_staleness(state, now, nudges)
+    # 1–2. Booking deadline and research staleness nudges (one pass over research)
+    _check_research(state, now, nudges)
 
     # 3. Budget drift nudge
     _check_budget_drift(state, nudges)
@@ -57,40 +59,13 @@ def check_nudge_triggers(state: dict) -> list[dict]:
     return nudges
 
 
-def _check_booking_deadlines(state: dict, now: datetime, nudges: list) -> None:
-    """Check for must-do items that need advance booking and trip is approaching."""
-    dates = state.get("dates", {})
-    trip_start = dates.get("start", "")
-    if not trip_start:
-        return
+def _check_research(state: dict, now: datetime, nudges: list) -> None:
+    """Check research for booking deadlines and staleness as the trip approaches.
 
-    try:
-        trip_dt = datetime.fromisoformat(trip_start + "T00:00:00+00:00")
-        days_until = (trip_dt - now).days
-    except (ValueError, TypeError):
-        return
-
-    if days_until > 14 or days_until < 0:
-        return
-
-    # Check research for items needing advance booking
-    research = state.get("research", {})
-    for city_name, city_data in research.items():
-        for category in ("places", "activities"):
-            for item in city_data.get(category, []):
-                if item.get("advance_booking"):
-                    nudges.append({
-                        "type": "booking_deadline",
-                        "priority": "high" if days_until <= 7 else "medium",
-                        "message": (
-                            f"\ud83d\udd34 Booking reminder: {item.get('name', '?')} in {city_name} "
-                            f"needs advance booking and your trip starts in {days_until} days!"
-                        ),
-                    })
-
-
-def _check_research_staleness(state: dict, now: datetime, nudges: list) -> None:
-    """Check if research is stale and trip is approaching."""
+    Both checks share one parse of the trip start and one pass over research.
+    Booking reminders fire within 14 days of departure, staleness warnings
+    within 30; booking reminders are listed first.
+    """
     dates = state.get("dates", {})
     trip_start = dates.get("start", "")
     if not trip_start:
@@ -105,19 +80,36 @@ def _check_research_staleness(state: dict, now: datetime, nudges: list) -> None:
     if days_until > 30 or days_until < 0:
         return
 
-    research = state.get("research", {})
-    for city_name, city_data in research.items():
+    check_booking = days_until <= 14
+    booking_nudges: list[dict] = []
+    stale_nudges: list[dict] = []
+    for city_name, city_data in state.get("research", {}).items():
+        # Items needing advance booking
+        if check_booking:
+            for category in ("places", "activities"):
+                for item in city_data.get(category, []):
+                    if item.get("advance_booking"):
+                        booking_nudges.append({
+                            "type": "booking_deadline",
+                            "priority": "high" if days_until <= 7 else "medium",
+                            "message": (
+                                f"\ud83d\udd34 Booking reminder: {item.get('name', '?')} in {city_name} "
+                                f"needs advance booking and your trip starts in {days_until} days!"
+                            ),
+                        })
+
+        # Research age
         last_updated = city_data.get("last_updated", "")
         if not last_updated:
             continue
         try:
-            updated_dt = datetime.fromisoformat(last_updated.replace("Z", "+00:00"))
+            updated_dt = datetime.fromisoformat(last_updated)
             age_days = (now - updated_dt).days
         except (ValueError, TypeError):
             continue
 
         if age_days > 14:
-            nudges.append({
+            stale_nudges.append({
                 "type": "research_stale",
                 "priority": "low",
                 "message": (
@@ -127,6 +119,9 @@ def _check_research_staleness(state: dict, now: datetime, nudges: list) -> None:
                 ),
             })
 
+    nudges.extend(booking_nudges)
+    nudges.extend(stale_nudges)
+
 
 def _check_budget_drift(state: dict, nudges: list) -> None:
     """Check if spending is trending over budget."""
@@ -195,7 +190,7 @@ def _check_stale_trip(state: dict, now: datetime, nudges: list) -> None:
         return
 
     try:
-        updated_dt = datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
+        updated_dt = datetime.fromisoformat(updated_at)
         days_since = (now - updated_dt).days
     except (ValueError, TypeError):
         return
@@ -223,8 +218,7 @@ def format_nudge_message(nudges: list[dict]) -> str:
         return ""
 
     # Sort by priority
-    priority_order = {"high": 0, "medium": 1, "low": 2}
-    nudges.sort(key=lambda n: priority_order.get(n.get("priority", "low"), 2))
+    nudges.sort(key=_priority_rank)
 
     parts = ["Hey! A few things to keep in mind:\n"]
     for nudge in nudges[:5]:  # Cap at 5 nudges
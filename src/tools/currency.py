@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 
 import httpx
 
@@ -14,6 +16,9 @@ ZERO_DECIMAL_CURRENCIES = frozenset({
     "PYG", "RWF", "UGX", "VND", "VUV", "XAF", "XOF", "XPF",
 })
 
+# Format spec per zero-decimal code; anything else gets two decimals.
+_FORMAT_SPECS = dict.fromkeys(ZERO_DECIMAL_CURRENCIES, ",.0f")
+
 
 def is_zero_decimal(code: str) -> bool:
     """Check if a currency uses zero decimal places."""
@@ -34,9 +39,8 @@ def convert_to_local(usd_amount: float, rate: float) -> float:
 
 def format_local(amount: float, symbol: str, code: str) -> str:
     """Format an amount in local currency with proper decimal handling."""
-    if is_zero_decimal(code):
-        return f"{symbol}{amount:,.0f}"
-    return f"{symbol}{amount:,.2f}"
+    spec = _FORMAT_SPECS.get(code) or _FORMAT_SPECS.get(code.upper(), ",.2f")
+    return f"{symbol}{amount:{spec}}"
 
 
 def format_usd(amount: float) -> str:
@@ -56,23 +60,70 @@ def format_dual(
     return f"{local_str} (~${usd:,.2f})"
 
 
+# Shared client so repeated rate fetches reuse pooled keep-alive connections
+# instead of paying a TCP + TLS handshake per call. Created on first use.
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_keepalive_connections=8))
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client (called on bot shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# One API response carries every rate for its base currency, so cache the whole
+# table per base: trips sharing a currency reuse one fetch for an hour, and
+# concurrent callers wait on the same in-flight request instead of each firing one.
+_RATE_TTL = 3600
+_rates_cache: dict[str, tuple[float, dict]] = {}
+_rates_locks: dict[str, asyncio.Lock] = {}
+
+
+async def _fetch_rates(base: str) -> dict:
+    cached = _rates_cache.get(base)
+    if cached and time.monotonic() - cached[0] < _RATE_TTL:
+        return cached[1]
+    lock = _rates_locks.get(base)
+    if lock is None:
+        lock = _rates_locks[base] = asyncio.Lock()
+    async with lock:
+        cached = _rates_cache.get(base)
+        if cached and time.monotonic() - cached[0] < _RATE_TTL:
+            return cached[1]
+        resp = await _get_client().get(f"https://open.er-api.com/v6/latest/{base}")
+        resp.raise_for_status()
+        data = resp.json()
+        rates = data.get("rates")
+        # Error bodies come back as HTTP 200 — only a real rate table is cached
+        if data.get("result") != "success" or not rates:
+            logger.warning("Exchange rate API returned no rates for %s: %s", base, data.get("error-type"))
+            return {}
+        _rates_cache[base] = (time.monotonic(), rates)
+        return rates
+
+
 async def refresh_exchange_rate(from_code: str, to_code: str = "USD") -> float | None:
     """Fetch a fresh exchange rate from a free API.
 
     Returns rate as 'from_code per to_code' (e.g. JPY per USD = ~148).
+    Rate tables are cached per base currency for an hour.
     Returns None on failure.
     """
-    url = f"https://open.er-api.com/v6/latest/{to_code}"
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-            rates = data.get("rates", {})
-            rate = rates.get(from_code.upper())
-            if rate:
-                logger.info("Exchange rate %s/%s = %s", from_code, to_code, rate)
-            return rate
+        rates = await _fetch_rates(to_code.upper())
+        rate = rates.get(from_code.upper())
+        if rate:
+            logger.info("Exchange rate %s/%s = %s", from_code, to_code, rate)
+        return rate
     except Exception:
         logger.exception("Failed to fetch exchange rate %s/%s", from_code, to_code)
         return None
@@ -97,7 +148,7 @@ async def auto_refresh_rate(state: dict) -> dict | None:
     if researched_at:
         from datetime import datetime, timezone
         try:
-            researched_dt = datetime.fromisoformat(researched_at.replace("Z", "+00:00"))
+            researched_dt = datetime.fromisoformat(researched_at)
             hours_since = (datetime.now(timezone.utc) - researched_dt).total_seconds() / 3600
             if hours_since < 24:
                 return None  # Rate is fresh enough
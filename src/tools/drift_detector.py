@@ -3,9 +3,13 @@
 from __future__ import annotations
 
 import logging
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
+_ENERGY_MAP = {"low": 1, "medium": 2, "high": 3}
+_FOOD_MAP = {"amazing": 5, "good": 4, "meh": 2, "bad": 1}
+
 
 def detect_drift(feedback_log: list[dict]) -> dict:
     """Analyze trends across feedback entries.
@@ -18,12 +22,27 @@ def detect_drift(feedback_log: list[dict]) -> dict:
 
     signals: dict = {}
 
-    # Energy trend
-    energy_levels = [f.get("energy_level", "medium") for f in feedback_log]
-    energy_map = {"low": 1, "medium": 2, "high": 3}
-    energy_values = [energy_map.get(e, 2) for e in energy_levels]
+    # Energy and budget only look at the last three entries. Food ratings and
+    # sentiments skip blank entries, so they ride along with the totals in one
+    # pass over the whole log.
+    tail = feedback_log[-3:]
+    recent_energy = [_ENERGY_MAP.get(f.get("energy_level", "medium"), 2) for f in tail]
+    recent_budget = [f.get("budget_status", "on_track") for f in tail]
+    recent_food: deque[int] = deque(maxlen=3)
+    recent_sentiments: deque[str] = deque(maxlen=3)
+    all_shifts: list = []
+    total_completed = total_skipped = total_discoveries = 0
+    for f in feedback_log:
+        if rating := f.get("food_rating"):
+            recent_food.append(_FOOD_MAP.get(rating, 3))
+        if sentiment := f.get("sentiment"):
+            recent_sentiments.append(sentiment)
+        all_shifts.extend(f.get("preference_shifts", ()))
+        total_completed += len(f.get("completed_items", ()))
+        total_skipped += len(f.get("skipped_items", ()))
+        total_discoveries += len(f.get("discoveries", ()))
 
-    recent_energy = energy_values[-3:] if len(energy_values) >= 3 else energy_values
+    # Energy trend
     low_count = sum(1 for e in recent_energy if e == 1)
     if low_count >= 2:
         signals["energy_drift"] = "declining"
@@ -35,20 +54,16 @@ def detect_drift(feedback_log: list[dict]) -> dict:
         signals["energy_drift"] = "stable"
 
     # Budget drift
-    budget_statuses = [f.get("budget_status", "on_track") for f in feedback_log]
-    over_count = sum(1 for b in budget_statuses[-3:] if b == "over")
+    over_count = sum(1 for b in recent_budget if b == "over")
     if over_count >= 2:
         signals["budget_drift"] = "overspending"
-    elif all(b == "under" for b in budget_statuses[-3:]):
+    elif all(b == "under" for b in recent_budget):
         signals["budget_drift"] = "underspending"
     else:
         signals["budget_drift"] = "on_track"
 
     # Food rating trend
-    food_ratings = [f.get("food_rating", "") for f in feedback_log if f.get("food_rating")]
-    food_map = {"amazing": 5, "good": 4, "meh": 2, "bad": 1}
-    if food_ratings:
-        recent_food = [food_map.get(r, 3) for r in food_ratings[-3:]]
+    if recent_food:
         avg_food = sum(recent_food) / len(recent_food)
         if avg_food < 2.5:
             signals["food_drift"] = "declining"
@@ -58,21 +73,14 @@ def detect_drift(feedback_log: list[dict]) -> dict:
             signals["food_drift"] = "stable"
 
     # Preference shifts accumulation
-    all_shifts = []
-    for f in feedback_log:
-        shifts = f.get("preference_shifts", [])
-        all_shifts.extend(shifts)
     if all_shifts:
         signals["accumulated_shifts"] = all_shifts[-5:]  # Last 5 shifts
 
     # Sentiment trend
-    sentiments = [f.get("sentiment", "") for f in feedback_log if f.get("sentiment")]
-    if sentiments:
-        signals["recent_sentiments"] = sentiments[-3:]
+    if recent_sentiments:
+        signals["recent_sentiments"] = list(recent_sentiments)
 
     # Activity completion rate
-    total_completed = sum(len(f.get("completed_items", [])) for f in feedback_log)
-    total_skipped = sum(len(f.get("skipped_items", [])) for f in feedback_log)
     total_planned = total_completed + total_skipped
     if total_planned > 0:
         completion_rate = total_completed / total_planned
@@ -83,7 +91,6 @@ def detect_drift(feedback_log: list[dict]) -> dict:
             signals["schedule_drift"] = "well_paced"
 
     # Discoveries (organic finds vs planned)
-    total_discoveries = sum(len(f.get("discoveries", [])) for f in feedback_log)
     if total_discoveries > len(feedback_log):
         signals["discovery_rate"] = "high"  # More discoveries than days = exploring well
 
@@ -1,11 +1,13 @@
 """Library sync tool — syncs trip state to markdown knowledge base.
 
-Extracted from LibrarianAgent (v2). No LLM call needed — pure file I/O.
+Extracted from LibrarianAgent (v2). No LLM call needed — pure file I/O, done
+in a worker thread so the bot's event loop isn't blocked.
 Called directly by handlers.py for /library command and auto-sync.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import datetime, timezone
 
@@ -21,7 +23,8 @@ async def library_sync(state: dict) -> dict:
       - response: str (summary of what was synced)
       - library: dict (updated LibraryConfig)
     """
-    library = MarkdownLibrary()
+    # Writers only render here; the files are written in one batch off the event loop
+    library = MarkdownLibrary(deferred=True)
     dest = state.get("destination", {})
     country = dest.get("country", "Unknown")
     flag = dest.get("flag_emoji", "")
@@ -105,6 +108,8 @@ async def library_sync(state: dict) -> dict:
     )
     messages.append("INDEX.md updated")
 
+    await asyncio.to_thread(library.flush)
+
     # Update library config
     library_config["last_synced"] = datetime.now(timezone.utc).isoformat()
 
@@ -34,18 +34,42 @@ class MarkdownLibrary:
             └── day-{N}.md
     """
 
-    def __init__(self, base_path: str = "./data/library") -> None:
+    def __init__(self, base_path: str = "./data/library", deferred: bool = False) -> None:
+        """With *deferred*, writer methods only render — files are queued until ``flush``."""
         self.base_path = base_path
+        self._pending: list[tuple[str, str]] | None = [] if deferred else None
 
     def _ensure_dir(self, path: str) -> None:
         os.makedirs(path, exist_ok=True)
 
     def _write(self, filepath: str, content: str) -> None:
+        if self._pending is not None:
+            self._pending.append((filepath, content))
+            return
         self._ensure_dir(os.path.dirname(filepath))
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(content)
         logger.info("Wrote %s", filepath)
 
+    def flush(self) -> int:
+        """Write all queued files in order and return how many were written.
+
+        Blocking — async callers run it via ``asyncio.to_thread`` so a whole sync's
+        worth of small file writes costs one hop off the event loop.
+        """
+        pending, self._pending = self._pending or [], []
+        made: set[str] = set()
+        for filepath, content in pending:
+            dirname = os.path.dirname(filepath)
+            if dirname not in made:
+                self._ensure_dir(dirname)
+                made.add(dirname)
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(content)
+        if pending:
+            logger.info("Wrote %d library files", len(pending))
+        return len(pending)
+
     def _slug(self, name: str) -> str:
         return name.lower().replace(" ", "-").replace("'", "")
 
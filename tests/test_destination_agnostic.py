@@ -115,6 +115,41 @@ class TestCurrencyFormatting:
         assert convert(14800, 148.0) == 100.0
         assert convert_to_local(100, 148.0) == 14800.0
 
+    async def test_rate_fetch_cached_per_base(self, monkeypatch):
+        import asyncio
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.tools import currency
+
+        resp = MagicMock()
+        resp.json.return_value = {"result": "success", "rates": {"JPY": 148.0, "EUR": 0.92}}
+        client = MagicMock(get=AsyncMock(return_value=resp))
+        monkeypatch.setattr(currency, "_get_client", lambda: client)
+        monkeypatch.setattr(currency, "_rates_cache", {})
+
+        jpy, eur = await asyncio.gather(
+            currency.refresh_exchange_rate("JPY"),
+            currency.refresh_exchange_rate("eur"),
+        )
+        assert (jpy, eur) == (148.0, 0.92)
+        assert client.get.await_count == 1
+
+    async def test_rate_error_body_not_cached(self, monkeypatch):
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.tools import currency
+
+        resp = MagicMock()
+        resp.json.return_value = {"result": "error", "error-type": "unsupported-code"}
+        client = MagicMock(get=AsyncMock(return_value=resp))
+        monkeypatch.setattr(currency, "_get_client", lambda: client)
+        monkeypatch.setattr(currency, "_rates_cache", {})
+
+        assert await currency.refresh_exchange_rate("JPY") is None
+        assert await currency.refresh_exchange_rate("JPY") is None
+        assert client.get.await_count == 2
+        assert currency._rates_cache == {}
+
 
 class TestFormattersDynamic:
     """Test that formatters read from state, not hardcode."""
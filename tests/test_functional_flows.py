@@ -13,6 +13,7 @@ import json
 import uuid
 from copy import deepcopy
 from datetime import datetime, timezone
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -27,7 +28,7 @@ from src.agents.orchestrator import (
     generate_status,
 )
 from src.agents.onboarding import OnboardingAgent
-from src.agents.base import BaseAgent, add_to_conversation_history
+from src.agents.base import BaseAgent
 from src.graph import (
     END,
     _specialist_node,
@@ -42,7 +43,7 @@ from src.telegram.handlers import (
     _extract_response,
     _handle_join,
     _handle_trip_management,
-    _list_trips,
+    _list_mytrips,
 )
 from src.db.persistence import TripRepository
 
@@ -1559,12 +1560,12 @@ class TestTripSharing:
         update = make_mock_update("/trips", user_id=12345)
         context = make_mock_context(active_trip_id="own-trip", repo=repo)
 
-        await _list_trips(update, context, "user-A", repo)
+        await _list_mytrips(update, context, "user-A", repo)
 
         update.message.reply_text.assert_called_once()
         reply_text = update.message.reply_text.call_args[0][0]
-        assert "[owner]" in reply_text
-        assert "[member]" in reply_text
+        assert "owner" in reply_text
+        assert "member" in reply_text
 
     @pytest.mark.asyncio
     async def test_list_trips_includes_owned_and_joined(self, async_db):
@@ -1660,6 +1661,142 @@ class TestHandlerShortCircuits:
 
         mock_graph.ainvoke.assert_not_called()
 
+    @pytest.mark.asyncio
+    async def test_reply_sent_while_turn_saves(self, async_db):
+        """The graph reply goes out concurrently with the state write."""
+        import asyncio
+
+        repo = async_db
+        await repo.create_trip("trip-par", "12345", {"onboarding_complete": True})
+
+        mock_graph = MagicMock()
+        mock_graph.ainvoke = AsyncMock(return_value={
+            "messages": [{"role": "assistant", "content": "Sounds good!"}],
+            "current_agent": "orchestrator",
+            "trip_id": "trip-par",
+            "onboarding_complete": True,
+        })
+        mock_graph.aget_state = AsyncMock(return_value=SimpleNamespace(values={"trip_id": "trip-par"}))
+        update = make_mock_update("hello", user_id=12345)
+        replied = asyncio.Event()
+        update.message.reply_text = AsyncMock(side_effect=lambda _text: replied.set())
+
+        real_save = repo.save_turn
+
+        async def save_after_reply(*args, **kwargs):
+            # Deadlocks (then times out and skips the write) if the reply waits for the save
+            await asyncio.wait_for(replied.wait(), 1)
+            await real_save(*args, **kwargs)
+
+        repo.save_turn = save_after_reply
+        context = make_mock_context(active_trip_id="trip-par", graph=mock_graph, repo=repo)
+
+        from src.telegram.handlers import process_message
+        await process_message(update, context)
+
+        update.message.reply_text.assert_awaited_once_with("Sounds good!")
+        messages = await repo.get_messages("trip-par")
+        assert [m.role for m in messages] == ["user", "assistant"]
+
+    @pytest.mark.asyncio
+    async def test_failed_save_is_reported_after_reply(self, async_db):
+        """A save that fails after the reply went out is followed by a warning."""
+        repo = async_db
+        await repo.create_trip("trip-fail", "12345", {"onboarding_complete": True})
+        mock_graph = MagicMock()
+        mock_graph.ainvoke = AsyncMock(return_value={
+            "messages": [{"role": "assistant", "content": "Sounds good!"}],
+            "trip_id": "trip-fail",
+        })
+        mock_graph.aget_state = AsyncMock(return_value=SimpleNamespace(values={"trip_id": "trip-fail"}))
+        repo.save_turn = AsyncMock(side_effect=RuntimeError("disk full"))
+        update = make_mock_update("hello", user_id=12345)
+        context = make_mock_context(active_trip_id="trip-fail", graph=mock_graph, repo=repo)
+
+        from src.telegram.handlers import process_message
+        await process_message(update, context)
+
+        sent = [c.args[0] for c in update.message.reply_text.await_args_list]
+        assert sent[0] == "Sounds good!"
+        assert "couldn't save" in sent[1]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("checkpointed, seeded", [(True, False), (False, True)])
+    async def test_graph_input_seeds_history_only_without_checkpoint(self, async_db, checkpointed, seeded):
+        """Prior state is spread into the input; history only when the checkpointer lacks the thread."""
+        repo = async_db
+        history = [{"role": "user", "content": "old", "timestamp": "t", "agent": None}]
+        await repo.create_trip("trip-hist", "12345", {
+            "onboarding_complete": True,
+            "conversation_history": history,
+        })
+        mock_graph = MagicMock()
+        mock_graph.ainvoke = AsyncMock(return_value={
+            "messages": [{"role": "assistant", "content": "ok"}],
+            "trip_id": "trip-hist",
+        })
+        values = {"conversation_history": history} if checkpointed else {}
+        mock_graph.aget_state = AsyncMock(return_value=SimpleNamespace(values=values))
+        update = make_mock_update("hello", user_id=12345)
+        context = make_mock_context(active_trip_id="trip-hist", graph=mock_graph, repo=repo)
+
+        from src.telegram.handlers import process_message
+        await process_message(update, context)
+
+        graph_input = mock_graph.ainvoke.call_args.args[0]
+        assert graph_input["onboarding_complete"] is True
+        assert ("conversation_history" in graph_input) is seeded
+
+    @pytest.mark.asyncio
+    async def test_lost_checkpoint_reseeds_history_from_message_log(self, async_db):
+        """Without a checkpoint, history comes from the full log, not the stored window."""
+        repo = async_db
+        await repo.create_trip("trip-log", "12345", {
+            "onboarding_complete": True,
+            "conversation_history": [{"role": "user", "content": "stale", "timestamp": "t", "agent": None}],
+        })
+        await repo.bulk_append_messages("trip-log", [
+            {"role": "user", "content": "where to eat?"},
+            {"role": "assistant", "content": "Try Nishiki", "agent": "research"},
+        ])
+        mock_graph = MagicMock()
+        mock_graph.ainvoke = AsyncMock(return_value={
+            "messages": [{"role": "assistant", "content": "ok"}],
+            "trip_id": "trip-log",
+        })
+        mock_graph.aget_state = AsyncMock(return_value=SimpleNamespace(values={}))
+        update = make_mock_update("hello", user_id=12345)
+        context = make_mock_context(active_trip_id="trip-log", graph=mock_graph, repo=repo)
+
+        from src.telegram.handlers import process_message
+        await process_message(update, context)
+
+        history = mock_graph.ainvoke.call_args.args[0]["conversation_history"]
+        assert [h["content"] for h in history] == ["where to eat?", "Try Nishiki"]
+
+    @pytest.mark.asyncio
+    async def test_group_chat_command_mentions_are_stripped(self, async_db):
+        """/cmd@BotName (group chats) dispatches like the bare command."""
+        repo = async_db
+        await repo.create_trip("trip-group", "owner-1", {
+            "destination": {"country": "Japan", "flag_emoji": ""},
+            "cities": [],
+        })
+        mock_graph = MagicMock()
+        mock_graph.ainvoke = AsyncMock()
+
+        update = make_mock_update("/join@TravelBot trip-group", user_id=77777)
+        context = make_mock_context(active_trip_id="default", graph=mock_graph, repo=repo)
+        from src.telegram.handlers import process_message
+        await process_message(update, context)
+        assert context.user_data["active_trip_id"] == "trip-group"
+        assert await repo.is_member("trip-group", "77777")
+
+        update = make_mock_update("/help@TravelBot", user_id=77777)
+        await process_message(update, context)
+        mock_graph.ainvoke.assert_not_called()
+        assert "/join" in update.message.reply_text.call_args.args[0]
+
     @pytest.mark.asyncio
     async def test_trip_new_generates_uuid_sets_active(self, async_db):
         """TC-HDL-02: /trip new generates UUID, sets active."""
@@ -1718,12 +1855,56 @@ class TestHandlerShortCircuits:
         update = make_mock_update("/trips", user_id=12345)
         context = make_mock_context(active_trip_id="my-trip", repo=repo)
 
-        await _list_trips(update, context, "user-X", repo)
+        await _list_mytrips(update, context, "user-X", repo)
 
         update.message.reply_text.assert_called_once()
         reply_text = update.message.reply_text.call_args[0][0]
-        assert "[owner]" in reply_text
-        assert "my-trip" in reply_text
+        assert "owner" in reply_text
+        assert "Japan Trip (current)" in reply_text
+
+    @pytest.mark.asyncio
+    async def test_trips_listing_reuses_render_until_active_trip_changes(self, async_db):
+        """Repeated /trips reuses the cached render; switching trips re-renders."""
+        repo = async_db
+        await repo.create_trip("trip-a", "user-X", {"destination": {"country": "Japan"}})
+        await repo.create_trip("trip-b", "user-X", {"destination": {"country": "Peru"}})
+
+        update = make_mock_update("/trips", user_id=12345)
+        context = make_mock_context(active_trip_id="trip-a", repo=repo)
+
+        with patch.object(repo, "list_trips", wraps=repo.list_trips) as list_trips:
+            await _list_mytrips(update, context, "user-X", repo)
+            await _list_mytrips(update, context, "user-X", repo)
+            assert list_trips.await_count == 1
+
+            context.user_data["active_trip_id"] = "trip-b"
+            await _list_mytrips(update, context, "user-X", repo)
+            assert list_trips.await_count == 2
+
+        assert "Peru Trip (current)" in update.message.reply_text.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_trip_selection_reuses_access_check(self, async_db):
+        """Inline trip switching checks membership once, then reuses it briefly."""
+        from src.telegram.handlers import handle_trip_selection
+
+        repo = async_db
+        await repo.create_trip("shared", "owner-1", {"destination": {"country": "Japan"}})
+        await repo.add_member("shared", "12345")
+
+        update = make_mock_update("", user_id=12345)
+        update.callback_query.answer = AsyncMock()
+        update.callback_query.edit_message_text = AsyncMock()
+        update.callback_query.data = "trip_select:shared"
+        context = make_mock_context(active_trip_id="default", repo=repo)
+
+        with patch.object(repo, "is_member", wraps=repo.is_member) as is_member:
+            await handle_trip_selection(update, context)
+            await handle_trip_selection(update, context)
+
+        assert is_member.await_count == 1
+        assert context.user_data["active_trip_id"] == "shared"
+        assert "Switched to" in update.callback_query.edit_message_text.call_args[0][0]
 
     def test_long_response_split_at_paragraph_boundaries(self):
         """TC-HDL-06: Long response split at paragraph boundaries (< 4096 chars each)."""
@@ -1783,12 +1964,32 @@ class TestErrorHandling:
         assistant_msgs = [m for m in history if m.get("role") == "assistant"]
         assert len(assistant_msgs) > 0
 
+    @pytest.mark.asyncio
+    async def test_terminal_node_clears_turn_keys(self, japan_state):
+        """Per-turn routing keys are nulled so they are not checkpointed or replayed."""
+        state = dict(japan_state)
+        state["_user_message"] = "what's in Kyoto?"
+        state["_routing_echo"] = "Let me check with the research team..."
+        state["messages"] = [{"role": "user", "content": "what's in Kyoto?"}]
+
+        with patch("src.graph._get_agent") as mock_get:
+            mock_agent = MagicMock()
+            mock_agent.handle = AsyncMock(return_value={"response": "Temples.", "state_updates": {}})
+            mock_get.return_value = mock_agent
+
+            result = await _specialist_node("research", state)
+
+        assert result["messages"][0]["content"].endswith("Temples.")
+        assert result["_next"] is None
+        assert result["_user_message"] is None
+        assert result["_routing_echo"] is None
+
     def test_state_save_filters_internal_keys(self):
         """TC-ERR-03: State save filtered (no _next, _user_message, messages, and v2 control keys)."""
         assert _INTERNAL_KEYS == {
             "_next", "_user_message", "messages", "_awaiting_input", "_callback",
             "_delegate_to", "_chain", "_routing_echo", "_error_agent", "_error_context",
-            "_loopback_depth",
+            "_loopback_depth", "_fan_out", "_fan_out_results",
         }
 
         result = {
@@ -2122,32 +2323,40 @@ class TestUXAuditAdditions:
 
 
 # =============================================================================
-# ADDITIONAL COVERAGE: add_to_conversation_history
+# ADDITIONAL COVERAGE: conversation history reducer
 # =============================================================================
 
 
 class TestConversationHistory:
-    """Tests for the conversation history utility."""
-
-    def test_adds_message_with_timestamp(self, empty_state):
-        """add_to_conversation_history appends correctly."""
-        history = add_to_conversation_history(empty_state, "user", "hello")
-        assert len(history) == 1
-        assert history[0]["role"] == "user"
-        assert history[0]["content"] == "hello"
-        assert "timestamp" in history[0]
-
-    def test_preserves_existing_history(self, japan_state):
-        """Existing history is preserved when appending."""
-        state = dict(japan_state)
-        state["conversation_history"] = [
-            {"role": "user", "content": "old msg", "timestamp": "t1", "agent": None}
+    """Tests for the conversation_history reducer."""
+
+    def test_history_reducer_appends_deltas(self):
+        """Node deltas are appended to the existing history."""
+        from src.state import merge_conversation_history
+
+        old = [{"role": "user", "content": "hi", "timestamp": "t0", "agent": None}]
+        delta = [
+            {"role": "user", "content": "next", "timestamp": "t1", "agent": None},
+            {"role": "assistant", "content": "ok", "timestamp": "t1", "agent": "research"},
+        ]
+        merged = merge_conversation_history(old, delta)
+        assert [m["content"] for m in merged] == ["hi", "next", "ok"]
+        assert merge_conversation_history(merged, []) is merged
+
+    def test_history_reducer_bounds_to_window(self):
+        """The reducer appends, then keeps only the most recent window."""
+        from src.agents.constants import CONVERSATION_HISTORY_WINDOW
+        from src.state import merge_conversation_history
+
+        old = [
+            {"role": "user", "content": f"m{i}", "timestamp": f"t{i}", "agent": None}
+            for i in range(CONVERSATION_HISTORY_WINDOW)
         ]
-        history = add_to_conversation_history(state, "assistant", "new msg", agent="orchestrator")
-        assert len(history) == 2
-        assert history[0]["content"] == "old msg"
-        assert history[1]["content"] == "new msg"
-        assert history[1]["agent"] == "orchestrator"
+        # A delta equal to an earlier entry is still appended, never treated as a snapshot
+        merged = merge_conversation_history(old, [dict(old[0])])
+        assert len(merged) == CONVERSATION_HISTORY_WINDOW
+        assert merged[-1] == old[0]
+        assert merged[0] == old[1]
 
 
 # =============================================================================
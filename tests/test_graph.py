@@ -54,6 +54,21 @@ class TestGraphCompilation:
             assert len(branches) > 0, f"{agent_name} should have conditional edges but has none"
 
 
+class TestPrewarm:
+    """Verify specialist agents can be constructed eagerly at compile time."""
+
+    def test_prewarm_instantiates_every_agent(self, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "test-token")
+        from src.graph import SPECIALIST_AGENTS, _get_agent, prewarm_agents
+
+        agents = prewarm_agents()
+        assert len(agents) == len(SPECIALIST_AGENTS) + 1  # + orchestrator
+        assert all(agent is not None for agent in agents)
+        # Cached — a second lookup returns the same instance
+        assert _get_agent("research") is _get_agent("research")
+
+
 class TestRouting:
     """Test the conditional routing function."""
 
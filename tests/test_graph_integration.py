@@ -196,6 +196,23 @@ class TestStatusHandledDirectly:
             response = _extract_response(result)
             assert "Japan" in response or "Onboarding" in response
 
+    @pytest.mark.asyncio
+    async def test_command_reply_not_added_to_history(self):
+        with patch("src.graph._orchestrator") as mock_orch:
+            mock_orch.route = _mock_orchestrator_route("orchestrator", response="Status dashboard")
+
+            graph = compile_graph()
+            input_state = _onboarded_state(
+                messages=[{"role": "user", "content": "/status"}],
+                conversation_history=[],
+                _user_message="left over from an earlier turn",
+            )
+            result = await graph.ainvoke(input_state)
+
+            assert _extract_response(result) == "Status dashboard"
+            assert result.get("conversation_history", []) == []
+            assert result.get("_user_message") is None
+
 
 # ─── Test: prerequisite guard blocks ────────────────
 
@@ -220,6 +237,43 @@ class TestPrerequisiteGuard:
             assert "set up" in response.lower() or "trip first" in response.lower()
 
 
+# ─── Test: parallel fan-out ─────────────────────────
+
+
+class TestParallelFanOut:
+
+    @pytest.mark.asyncio
+    async def test_multiple_targets_run_and_merge(self):
+        agents = {
+            "scheduler": MagicMock(handle=_mock_agent_handle("Tomorrow: temples.", {"agent_scratch": {"s": 1}})),
+            "cost": MagicMock(handle=_mock_agent_handle("You've spent $120.", {"cost_tracker": {"totals": {}}})),
+        }
+        with (
+            patch("src.graph._orchestrator") as mock_orch,
+            patch("src.graph._get_agent", side_effect=agents.get),
+        ):
+            mock_orch.route = AsyncMock(return_value={
+                "target_agent": "scheduler",
+                "target_agents": ["scheduler", "cost"],
+            })
+
+            graph = compile_graph()
+            input_state = _onboarded_state(
+                messages=[{"role": "user", "content": "what's tomorrow and how much have I spent?"}],
+            )
+            result = await graph.ainvoke(input_state)
+
+        agents["scheduler"].handle.assert_awaited_once()
+        agents["cost"].handle.assert_awaited_once()
+        response = _extract_response(result)
+        assert response == "Tomorrow: temples.\n\nYou've spent $120."
+        assert result["agent_scratch"] == {"s": 1}
+        assert result["cost_tracker"] == {"totals": {}}
+        assert result["current_agent"] == "scheduler"
+        assert not result.get("_fan_out_results")
+        assert result["conversation_history"][-1]["content"] == response
+
+
 # ─── Test: all specialist routes ────────────────────
 
 
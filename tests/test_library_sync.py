@@ -8,6 +8,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from src.tools.library_sync import library_sync
+from src.tools.markdown_sync import MarkdownLibrary
 
 
 @pytest.fixture
@@ -164,3 +165,17 @@ class TestLibrarySync:
             result = await library_sync(sync_state)
 
         mock_instance.write_index.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_files_written_in_one_flush(self, sync_state, tmp_path):
+        """Writers queue their files; the batch lands on disk before sync returns."""
+        workspace = tmp_path / "japan-2026"
+        sync_state["library"] = {"workspace_path": str(workspace)}
+
+        with patch.object(MarkdownLibrary, "flush", autospec=True, side_effect=MarkdownLibrary.flush) as flush:
+            await library_sync(sync_state)
+
+        flush.assert_called_once()
+        assert (workspace / "INDEX.md").exists()
+        assert (workspace / "destination-guide.md").exists()
+        assert (workspace / "cities" / "tokyo" / "overview.md").exists()
@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
-import pytest
+import json
+from types import SimpleNamespace
 
 from src.agents.onboarding import _fallback_title
 from src.agents.orchestrator import COMMAND_MAP, generate_help
 from src.telegram.handlers import (
     _fallback_title_from_state,
     _format_date_range,
+    _listing_state,
     _trip_progress_indicator,
 )
 
@@ -60,6 +62,33 @@ class TestFormatDateRange:
         assert _format_date_range("not-a-date", "also-not") == ""
 
 
+class TestListingState:
+    def test_reads_listing_projection(self):
+        trip = SimpleNamespace(listing_json='{"trip_title": "Japan Spring"}', state_json='{"research": {}}')
+        assert _listing_state(trip) == {"trip_title": "Japan Spring"}
+
+    def test_legacy_row_projected_from_state(self):
+        state = {
+            "trip_title": "Japan Spring",
+            "destination": {"country": "Japan", "currency_code": "JPY"},
+            "research": {"Tokyo": {"places": []}},
+        }
+        trip = SimpleNamespace(listing_json=None, state_json=json.dumps(state))
+        assert _listing_state(trip) == {
+            "trip_title": "Japan Spring",
+            "destination": {"country": "Japan"},
+            "research": True,
+        }
+
+    def test_calls_do_not_share_state(self):
+        trip = SimpleNamespace(listing_json='{"destination": {"country": "Japan"}}', state_json=None)
+        _listing_state(trip)["destination"]["country"] = "Peru"
+        assert _listing_state(trip)["destination"]["country"] == "Japan"
+
+    def test_missing_json(self):
+        assert _listing_state(SimpleNamespace(listing_json=None, state_json=None)) == {}
+
+
 class TestTripProgress:
     def test_not_onboarded(self):
         state = {"onboarding_complete": False}
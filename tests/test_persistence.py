@@ -110,6 +110,21 @@ async def test_merge_state_preserves_existing_keys(async_db):
     assert state["research"]["Tokyo"]["places"] == ["Senso-ji"]
 
 
+@pytest.mark.asyncio
+async def test_upsert_state_creates_then_merges(async_db):
+    """upsert_state creates a missing trip, then merges into it on later calls."""
+    await async_db.upsert_state("trip-u1", "user-1", {"destination": {"country": "Japan"}, "plan_status": None})
+    trip = await async_db.get_trip("trip-u1")
+    assert trip.user_id == "user-1"
+    assert trip.destination_country == "Japan"
+
+    await async_db.upsert_state("trip-u1", "user-1", {"cities": [{"name": "Tokyo"}]})
+    state = json.loads((await async_db.get_trip("trip-u1")).state_json)
+    assert state["destination"]["country"] == "Japan"
+    assert state["cities"] == [{"name": "Tokyo"}]
+    assert "plan_status" in state and state["plan_status"] is None
+
+
 @pytest.mark.asyncio
 async def test_merge_state_overwrites_updated_keys(async_db):
     """Test that merge_state updates keys that are present in both old and new."""
@@ -188,3 +203,211 @@ async def test_owner_is_implicit_member(async_db):
     # get_joined_trips should NOT include owned trips
     joined = await async_db.get_joined_trips("owner-1")
     assert len(joined) == 0
+
+
+@pytest.mark.asyncio
+async def test_append_and_get_messages(async_db):
+    """Test the append-only message log returns messages in order."""
+    await async_db.bulk_append_messages("trip-1", [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello", "agent": "orchestrator"},
+    ])
+    await async_db.bulk_append_messages("trip-1", [{"role": "user", "content": "plan my trip"}])
+    await async_db.bulk_append_messages("trip-2", [{"role": "user", "content": "other trip"}])
+
+    messages = await async_db.get_messages("trip-1")
+    assert [m.content for m in messages] == ["hi", "hello", "plan my trip"]
+    assert messages[1].agent == "orchestrator"
+
+    recent = await async_db.get_messages("trip-1", limit=2)
+    assert [m.content for m in recent] == ["hello", "plan my trip"]
+
+
+@pytest.mark.asyncio
+async def test_recent_history_rebuilds_window_from_log(async_db):
+    """recent_history returns the log tail as conversation_history entries."""
+    await async_db.bulk_append_messages("trip-1", [
+        {"role": "user", "content": f"m{i}"} for i in range(5)
+    ] + [{"role": "assistant", "content": "latest", "agent": "research"}])
+
+    history = await async_db.recent_history("trip-1", limit=3)
+    assert [h["content"] for h in history] == ["m3", "m4", "latest"]
+    assert history[-1]["agent"] == "research"
+    assert history[-1]["timestamp"].endswith("+00:00")
+    assert await async_db.recent_history("missing", limit=3) == []
+
+
+@pytest.mark.asyncio
+async def test_membership_with_preloaded_trip(async_db):
+    """Test add_member/is_member reuse a trip the caller already loaded."""
+    await async_db.create_trip("trip-pre", "owner-1", {"destination": {"country": "Peru"}})
+    trip = await async_db.get_trip("trip-pre")
+
+    await async_db.add_member("trip-pre", "user-2", trip=trip)
+    assert await async_db.is_member("trip-pre", "user-2", trip=trip) is True
+    assert await async_db.is_member("trip-pre", "owner-1", trip=trip) is True
+    assert await async_db.is_member("trip-pre", "user-3") is False
+
+
+def test_normalize_database_url_uses_asyncpg():
+    """Plain Postgres URLs are rewritten to the asyncpg driver; others are untouched."""
+    from src.db.persistence import normalize_database_url
+
+    assert normalize_database_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert normalize_database_url("postgres://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert normalize_database_url("postgresql+asyncpg://h/db") == "postgresql+asyncpg://h/db"
+    assert normalize_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+
+def test_state_dump_tags_naive_datetimes_utc():
+    from datetime import datetime
+
+    from src.db.persistence import _dumps
+
+    dumped = json.loads(_dumps({"at": datetime(2025, 4, 1, 9, 30), 1: "x"}))
+    assert dumped == {"at": "2025-04-01T09:30:00+00:00", "1": "x"}
+
+
+def test_compressed_serializer_round_trip():
+    """Large checkpoint payloads are compressed; small and legacy ones pass through."""
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    from src.db.checkpoint_serde import CompressedSerializer
+
+    serde = CompressedSerializer()
+    big = {"detailed_agenda": [{"day": i, "slots": [{"title": "Temple visit"}] * 20} for i in range(14)]}
+    type_, data = serde.dumps_typed(big)
+    assert type_.startswith("zlib:")
+    assert len(data) < len(JsonPlusSerializer().dumps_typed(big)[1])
+    assert serde.loads_typed((type_, data)) == big
+
+    small = {"current_agent": "cost"}
+    assert not serde.dumps_typed(small)[0].startswith("zlib:")
+    assert serde.loads_typed(JsonPlusSerializer().dumps_typed(small)) == small
+
+
+@pytest.mark.asyncio
+async def test_compressed_serializer_with_sqlite_checkpointer(tmp_path):
+    """The graph checkpointer stores and restores state through the compressed serde."""
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    from langgraph.graph import END, StateGraph
+    from typing_extensions import TypedDict
+
+    from src.db.checkpoint_serde import CompressedSerializer
+
+    class S(TypedDict):
+        blob: str
+
+    builder = StateGraph(S)
+    builder.add_node("n", lambda s: {"blob": s["blob"] * 2})
+    builder.set_entry_point("n")
+    builder.add_edge("n", END)
+
+    async with aiosqlite.connect(str(tmp_path / "ck.db")) as conn:
+        saver = AsyncSqliteSaver(conn, serde=CompressedSerializer())
+        graph = builder.compile(checkpointer=saver)
+        config = {"configurable": {"thread_id": "t1"}}
+        await graph.ainvoke({"blob": "x" * 4096}, config=config)
+        snapshot = await graph.aget_state(config)
+    assert snapshot.values["blob"] == "x" * 8192
+
+
+@pytest.mark.asyncio
+async def test_warmup(async_db):
+    """warmup() round-trips a query without touching any trip rows."""
+    await async_db.warmup()
+    assert await async_db.list_trips("nobody") == []
+
+
+@pytest.mark.asyncio
+async def test_listing_projection_kept_in_sync(async_db, japan_state):
+    """Every write refreshes listing_json, and listings render the same from it as from full state."""
+    from src.telegram.handlers import _format_trip_entry
+
+    await async_db.create_trip("proj-1", "user-1", {"destination": {"country": "Japan"}})
+    trip = await async_db.get_trip("proj-1")
+    assert json.loads(trip.listing_json) == {"destination": {"country": "Japan"}}
+
+    await async_db.merge_state("proj-1", dict(japan_state))
+    trip = await async_db.get_trip("proj-1")
+    projection = json.loads(trip.listing_json)
+    assert projection["trip_title"] == "Ramen & Temples Run"
+    assert projection["onboarding_complete"] is True
+    assert len(trip.listing_json) < len(trip.state_json)
+
+    from_projection = _format_trip_entry(trip, "other", "user-1")[0]
+    trip.listing_json = None
+    assert _format_trip_entry(trip, "other", "user-1")[0] == from_projection
+
+
+@pytest.mark.asyncio
+async def test_init_db_adds_listing_column(tmp_path):
+    """Databases created before listing_json existed gain the column on startup."""
+    from sqlalchemy import text
+
+    from src.db.persistence import TripRepository
+
+    repo = TripRepository(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+    async with repo.engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE trips (trip_id VARCHAR(128) PRIMARY KEY, user_id VARCHAR(64) NOT NULL, "
+            "destination_country VARCHAR(128), state_json TEXT NOT NULL, created_at DATETIME, "
+            "updated_at DATETIME, archived BOOLEAN DEFAULT 0 NOT NULL)"
+        ))
+        await conn.execute(text(
+            "INSERT INTO trips (trip_id, user_id, state_json) VALUES ('old-1', 'user-1', '{}')"
+        ))
+    await repo.init_db()
+    trip = await repo.get_trip("old-1")
+    assert trip.listing_json is None
+    await repo.merge_state("old-1", {"trip_title": "Spring"})
+    assert json.loads((await repo.get_trip("old-1")).listing_json) == {"trip_title": "Spring"}
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_init_db_replaces_old_active_index(tmp_path):
+    """The old (user_id, archived) index is swapped for the partial active-trips index."""
+    from sqlalchemy import inspect, text
+
+    from src.db.persistence import TripRepository
+
+    repo = TripRepository(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+    async with repo.engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE trips (trip_id VARCHAR(128) PRIMARY KEY, user_id VARCHAR(64) NOT NULL, "
+            "destination_country VARCHAR(128), state_json TEXT NOT NULL, created_at DATETIME, "
+            "updated_at DATETIME, archived BOOLEAN)"
+        ))
+        await conn.execute(text("CREATE INDEX idx_trips_active ON trips (user_id, archived)"))
+    await repo.init_db()
+    async with repo.engine.connect() as conn:
+        names = await conn.run_sync(lambda c: {ix["name"] for ix in inspect(c).get_indexes("trips")})
+    assert "idx_trips_active" not in names
+    assert "idx_trips_user_active" in names
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_save_turn_writes_state_messages_and_copy(async_db):
+    """save_turn upserts state, logs the turn and copies state to a new trip id together."""
+    await async_db.create_trip("default", "user-1", {"destination": {"country": "Japan"}})
+    await async_db.save_turn(
+        "default",
+        "user-1",
+        {"onboarding_complete": True, "trip_id": "abcd1234"},
+        messages=[
+            {"role": "user", "content": "yes"},
+            {"role": "assistant", "content": "Trip created!", "agent": "onboarding"},
+        ],
+        copy_to="abcd1234",
+    )
+
+    old = json.loads((await async_db.get_trip("default")).state_json)
+    assert old == {"destination": {"country": "Japan"}, "onboarding_complete": True, "trip_id": "abcd1234"}
+    new = await async_db.get_trip("abcd1234")
+    assert new.user_id == "user-1"
+    assert json.loads(new.state_json) == {"onboarding_complete": True, "trip_id": "abcd1234"}
+    messages = await async_db.get_messages("default")
+    assert [(m.role, m.agent) for m in messages] == [("user", None), ("assistant", "onboarding")]